@@ -18,11 +18,17 @@ Dependencies: flask, jwt, firebase-admin, spacy, spacytextblob, flask-limiter
 import sys
 import logging
 import re
-import string  # Import at module level for efficiency
-import uuid  # For request ID generation
-from math import radians, sin, cos, sqrt, atan2
+import json
+import itertools
+import secrets
+import time
+import hashlib
+from collections import OrderedDict
+from math import radians, sin, cos, sqrt, asin, pi
 from datetime import datetime, timedelta, timezone
-from threading import Thread, Lock
+from threading import Event, Lock, Thread, local
+from concurrent.futures import ThreadPoolExecutor
+import atexit
 from typing import Dict, Any, Optional, Tuple
 import os
 from dotenv import load_dotenv
@@ -31,18 +37,60 @@ load_dotenv()  # Load env vars for secrets
 
 import jwt
 from flask import Flask, request, jsonify, Response
+from flask.json.provider import DefaultJSONProvider
 import firebase_admin
 from firebase_admin import credentials, messaging
-import spacy
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+try:
+    import orjson  # Faster request parsing and jsonify
+except ImportError:
+    orjson = None
+
+try:
+    import ahocorasick  # pyahocorasick: one linear pass over the message for every keyword
+except ImportError:
+    ahocorasick = None
+
+try:
+    import hyperscan  # Vectorized literal matching; not available on Windows
+except ImportError:
+    hyperscan = None
+
+try:
+    import numpy as np  # Vectorized geofence math for batched location checks
+except ImportError:
+    np = None
+
 # Note: spacytextblob adds .blob attribute to spaCy Doc objects via pipeline
 
+
+class JSONLogFormatter(logging.Formatter):
+    """
+    One JSON object per line. Dict messages are merged into the record as fields and
+    only serialized here, after the level check has let the record through.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {"time": self.formatTime(record), "level": record.levelname}
+        if isinstance(record.msg, dict) and not record.args:
+            payload.update(record.msg)
+        else:
+            payload["message"] = record.getMessage()
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        if orjson:
+            return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        return json.dumps(payload, default=str)
+
+
 # Setup structured logging - JSON for easy monitoring in prod (must be before using logger)
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(JSONLogFormatter())
 logging.basicConfig(
-    level=logging.INFO,
-    format='{"time": "%(asctime)s", "level": "%(levelname)s", "message": "%(message)s"}'
+    level=getattr(logging, os.environ.get('LUNA_LOG_LEVEL', 'INFO').upper(), logging.INFO),
+    handlers=[_log_handler]
 )
 logger = logging.getLogger(__name__)
 
@@ -53,32 +101,128 @@ if not SECRET_KEY:
     raise SystemExit(1)
 FIREBASE_CRED_PATH = os.environ.get('FIREBASE_CRED_PATH', 'serviceAccountKey.json')
 
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    orjson-backed JSON provider for request.json and jsonify.
+    
+    Dates are handed to Flask's own default hook (OPT_PASSTHROUGH_DATETIME), so
+    they keep the HTTP-date format. Known differences from the stock provider:
+    - non-ASCII characters are written unescaped
+    - app.json.dumps() output is compact
+    - NaN and Infinity serialize as null; integers beyond 64 bits are rejected
+    """
+
+    _options = (
+        orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    ) if orjson else 0
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self._dump_bytes(obj, indent=bool(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self._dump_bytes(obj, indent=indent) + b'\n',
+            mimetype=self.mimetype
+        )
+
+    def _dump_bytes(self, obj, indent: bool = False) -> bytes:
+        option = self._options | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=self.default, option=option)
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+
+# Request ids for log correlation: a random per-process prefix, then a counter.
+# next() on itertools.count is atomic under the GIL, so ids never repeat in-process.
+def _reset_request_ids() -> None:
+    """Draw a fresh prefix and restart the counter for this process."""
+    global _REQUEST_ID_BASE, _request_counter
+    _REQUEST_ID_BASE = secrets.token_hex(3)
+    _request_counter = itertools.count(1)
+
+
+_reset_request_ids()
+# Workers forked from a preloaded master (gunicorn --preload) would otherwise inherit one prefix
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_request_ids)
+
+
+# Only allow alphanumeric characters, underscores, hyphens, and dots in user_id (ASCII only)
+_USER_ID_CHARS = re.compile(r'[A-Za-z0-9_.\-]*')
+
+
+def _request_id() -> str:
+    """Short id tying together the log lines of one request."""
+    return f"{_REQUEST_ID_BASE}{next(_request_counter):x}"
+
 
 # Rate limiter - prevent abuse (e.g., DoS on APIs)
 # Disable rate limiting in testing mode to avoid test failures
+# Point LUNA_LIMITER_STORAGE_URI at Redis (redis://host:6379/0) so gunicorn workers share one set of counters
+LIMITER_STORAGE_URI = os.environ.get('LUNA_LIMITER_STORAGE_URI', 'memory://')
 limiter = Limiter(
     get_remote_address,
     app=app,
     default_limits=["200 per day", "50 per hour"],
+    storage_uri=LIMITER_STORAGE_URI,
+    storage_options={'socket_connect_timeout': 1} if LIMITER_STORAGE_URI.startswith('redis') else {},
+    strategy='moving-window',  # One Lua script (one round trip) per check on Redis
+    in_memory_fallback_enabled=True,  # Keep serving safety checks if Redis is unreachable
     enabled=not app.testing  # Disable rate limiting during tests
 )
 
 # Load spaCy with sentiment (graceful fallback if missing)
-try:
-    nlp = spacy.load('en_core_web_sm')
-    # Import and register spacytextblob before adding to pipeline
-    from spacytextblob.spacytextblob import SpacyTextBlob
-    nlp.add_pipe('spacytextblob')
-    logger.info({"event": "spacy_load", "status": "success"})
-except Exception as e:
-    nlp = None
-    logger.warning({
-        "event": "spacy_load",
-        "status": "failed",
-        "error": str(e),
-        "impact": "NLP features disabled"
-    })
+# The model loads off the import path so the app starts serving at once; toxicity_score
+# uses its no-NLP fallback until nlp_ready is set. Use LUNA_SPACY_LOAD=eager with
+# gunicorn --preload so the model loads once in the master and workers share its pages.
+LUNA_SPACY_LOAD = os.environ.get('LUNA_SPACY_LOAD', 'background').lower()
+nlp = None
+TextBlob = None  # Published by _load_nlp with nlp; importing it pulls in NLTK
+nlp_ready = Event()
+
+
+def _load_nlp() -> None:
+    """Load the spaCy pipeline and publish it as the module-level nlp once it is complete."""
+    global nlp, TextBlob
+    try:
+        import spacy
+        # toxicity_score only reads doc.ents and the textblob polarity (computed from the raw
+        # text), so the tagger, parser, lemmatizer and attribute ruler are never loaded (exclude,
+        # not disable, so their weights don't sit in every worker's memory).
+        model = spacy.load('en_core_web_sm', exclude=['tagger', 'parser', 'lemmatizer', 'attribute_ruler'])
+        # ner embeds tokens itself in the packaged English pipelines; once nothing listens to
+        # the shared tok2vec any more it is dead weight on every call
+        if 'tok2vec' in model.pipe_names and not model.get_pipe('tok2vec').listening_components:
+            model.remove_pipe('tok2vec')
+        # Import and register spacytextblob before adding to pipeline
+        from spacytextblob.spacytextblob import SpacyTextBlob
+        from textblob import TextBlob as _TextBlob  # Installed with spacytextblob; its polarity settles most messages before spaCy
+        model.add_pipe('spacytextblob')
+        TextBlob = _TextBlob
+        nlp = model
+        logger.info({"event": "spacy_load", "status": "success", "components": nlp.pipe_names})
+    except Exception as e:
+        logger.warning({
+            "event": "spacy_load",
+            "status": "failed",
+            "error": str(e),
+            "impact": "NLP features disabled"
+        })
+    finally:
+        nlp_ready.set()
+
+
+if LUNA_SPACY_LOAD == 'eager':
+    _load_nlp()
+else:
+    Thread(target=_load_nlp, name='luna-spacy-load', daemon=True).start()
 
 # Mock function for Firebase messaging (module level for proper scoping)
 def messaging_send_mock(message) -> str:
@@ -125,6 +269,112 @@ danger_pattern = re.compile(
     re.IGNORECASE
 )
 
+# re.IGNORECASE also folds these onto the ASCII keyword letters; str.lower() does not
+_IGNORECASE_FOLD = str.maketrans({'\u0131': 'i', '\u017f': 's'})
+
+# Lowercased keyword -> category, built once so categorizing a match is one dict lookup
+KEYWORD_TO_CATEGORY = {w.lower(): cat for cat, words in DANGER_CATEGORIES.items() for w in words}
+
+
+def _danger_keywords():
+    """Unique lowercased keywords with their (alternation order, length, category)."""
+    keywords = {}
+    order = 0
+    for cat, words in DANGER_CATEGORIES.items():
+        for w in words:
+            kw = w.lower()
+            keywords.setdefault(kw, (order, len(kw), cat))
+            order += 1
+    return list(keywords.items())
+
+
+DANGER_KEYWORDS = _danger_keywords()
+
+
+def _build_danger_automaton():
+    """Automaton over all keywords; values are (alternation order, length, category)."""
+    automaton = ahocorasick.Automaton()
+    for kw, value in DANGER_KEYWORDS:
+        automaton.add_word(kw, value)
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_danger_database():
+    """Caseless Hyperscan database over all keywords; match ids index DANGER_KEYWORDS."""
+    database = hyperscan.Database()
+    database.compile(
+        expressions=[re.escape(kw).encode('ascii') for kw, _ in DANGER_KEYWORDS],
+        ids=list(range(len(DANGER_KEYWORDS))),
+        elements=len(DANGER_KEYWORDS),
+        flags=[hyperscan.HS_FLAG_CASELESS] * len(DANGER_KEYWORDS)
+    )
+    return database
+
+
+danger_automaton = _build_danger_automaton() if ahocorasick is not None else None
+danger_database = _build_danger_database() if hyperscan is not None else None
+
+# A Hyperscan scratch can only serve one scan at a time and scan() releases the GIL,
+# so each request thread gets its own scratch for danger_database.
+_hyperscan_local = local()
+
+
+def _hyperscan_scratch():
+    scratch = getattr(_hyperscan_local, 'scratch', None)
+    if scratch is None:
+        scratch = _hyperscan_local.scratch = hyperscan.Scratch(danger_database)
+    return scratch
+
+
+def _collect_hyperscan_hit(match_id, start, end, flags, hits):
+    # Hyperscan reports an exclusive end offset; store the inclusive one like the automaton
+    hits.append((end - 1, DANGER_KEYWORDS[match_id][1]))
+
+
+def _is_word_char(ch: str) -> bool:
+    # Same definition as the \b in danger_pattern
+    return ch.isalnum() or ch == '_'
+
+
+def _find_danger_matches(text: str) -> Optional[list]:
+    """
+    Lowercased (match, category) pairs with the same semantics as danger_pattern.findall:
+    whole words only, leftmost first, non-overlapping, ties broken by keyword order.
+    Returns None when no keyword matcher can handle the text.
+    """
+    if danger_database is not None and text.isascii():
+        # Caseless scan of the original text; byte offsets equal character offsets for ASCII
+        source = text
+        hits = []
+        danger_database.scan(text.encode('ascii'), match_event_handler=_collect_hyperscan_hit,
+                             context=hits, scratch=_hyperscan_scratch())
+    elif danger_automaton is not None:
+        # The automaton is case-sensitive, so it needs the lowered (and folded) copy
+        source = text.lower()
+        hits = danger_automaton.iter(source.translate(_IGNORECASE_FOLD))
+    else:
+        return None
+
+    last = len(source) - 1
+    candidates = []
+    for end, (order, length, cat) in hits:
+        start = end - length + 1
+        if start > 0 and _is_word_char(source[start - 1]):
+            continue
+        if end < last and _is_word_char(source[end + 1]):
+            continue
+        candidates.append((start, order, end + 1, cat))
+    candidates.sort()
+
+    found = []
+    pos = 0
+    for start, _, stop, cat in candidates:
+        if start >= pos:
+            found.append((source[start:stop].lower(), cat))
+            pos = stop
+    return found
+
 
 # 1. Keyword Scan: Flags, counts, categorizes for weighted scoring (input validation + logging)
 def scan_message(text: str) -> Dict[str, Any]:
@@ -141,19 +391,31 @@ def scan_message(text: str) -> Dict[str, Any]:
         if not isinstance(text, str) or not text.strip():
             raise ValueError("Input must be a non-empty string")
 
-        matches = danger_pattern.findall(text.lower())
+        found = _find_danger_matches(text)
+        if found is not None:
+            matches = []
+            categories = {cat: [] for cat in DANGER_CATEGORIES}
+            for match, cat in found:
+                matches.append(match)
+                categories[cat].append(match)
+        else:
+            # danger_pattern is IGNORECASE; only non-ASCII text needs the lowered copy to match as before
+            if text.isascii():
+                matches = [m.lower() for m in danger_pattern.findall(text)]
+            else:
+                matches = danger_pattern.findall(text.lower())
+            categories = {cat: [] for cat in DANGER_CATEGORIES}
+            for m in matches:
+                categories[KEYWORD_TO_CATEGORY[m.translate(_IGNORECASE_FOLD)]].append(m)
         count = len(matches)
-        categories = {
-            cat: [m for m in matches if m in [w.lower() for w in words]]
-            for cat, words in DANGER_CATEGORIES.items()
-        }
 
-        logger.info({
-            "event": "scan_message",
-            "input_length": len(text),
-            "matches": count
-            # Categories omitted from logs to protect privacy
-        })
+        if logger.isEnabledFor(logging.INFO):
+            logger.info({
+                "event": "scan_message",
+                "input_length": len(text),
+                "matches": count
+                # Categories omitted from logs to protect privacy
+            })
 
         # Weighted for severity
         return {
@@ -177,6 +439,101 @@ def scan_message(text: str) -> Dict[str, Any]:
 
 
 # 2. Toxicity Score: Sentiment polarity + entity recognition (weighted for context; fallback if spaCy missing)
+LUNA_SPACY_BATCH = int(os.environ.get('LUNA_SPACY_BATCH', '64'))
+
+
+# Nuanced threshold with reduced false positives:
+# - Strongly negative overall sentiment is toxic.
+# - Moderately negative sentiment is toxic only when multiple entities are involved.
+STRONG_TOXIC_THRESHOLD = -0.4
+MILD_TOXIC_THRESHOLD = -0.2
+MIN_ENTITIES_FOR_MILD = 3
+
+
+def _toxicity_from_doc(doc, polarity: Optional[float] = None) -> Dict[str, Any]:
+    """Score one processed spaCy Doc; shared by the single and batch paths."""
+    if polarity is None:
+        polarity = doc._.blob.polarity
+    # Detect entities that may indicate context worth flagging
+    detected_entities = [
+        ent.label_ for ent in doc.ents
+        if ent.label_ in ['FAC', 'CARDINAL', 'LOC', 'PERSON', 'ORG']
+    ]
+    entity_count = len(detected_entities)
+
+    is_toxic = (polarity <= STRONG_TOXIC_THRESHOLD) or (
+        entity_count >= MIN_ENTITIES_FOR_MILD and polarity <= MILD_TOXIC_THRESHOLD
+    )
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info({
+            "event": "toxicity_score",
+            "polarity": polarity,
+            "entities": entity_count
+            # Entity details omitted from logs to protect privacy
+        })
+
+    return {
+        'toxic': is_toxic,
+        'polarity': polarity,
+        'entity_count': entity_count,
+        'detected_entities': detected_entities
+    }
+
+
+# Scored messages keyed by a digest (raw chat text is not kept in memory). Scripted bot spam
+# repeats verbatim across children, so repeats skip spaCy entirely.
+LUNA_TOX_CACHE = int(os.environ.get('LUNA_TOX_CACHE', '4096'))
+_toxicity_cache: OrderedDict = OrderedDict()
+_toxicity_cache_lock = Lock()
+
+
+def _toxicity_key(sentence: str) -> bytes:
+    return hashlib.blake2b(sentence.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def _cached_toxicity(key: bytes) -> Optional[Dict[str, Any]]:
+    with _toxicity_cache_lock:
+        hit = _toxicity_cache.get(key)
+        if hit is None:
+            return None
+        _toxicity_cache.move_to_end(key)
+    # Copy so callers can't mutate the cached entry
+    return {**hit, 'detected_entities': list(hit['detected_entities'])}
+
+
+def _cache_toxicity(key: bytes, result: Dict[str, Any]) -> None:
+    if not LUNA_TOX_CACHE:
+        return
+    with _toxicity_cache_lock:
+        _toxicity_cache[key] = {**result, 'detected_entities': list(result['detected_entities'])}
+        _toxicity_cache.move_to_end(key)
+        while len(_toxicity_cache) > LUNA_TOX_CACHE:
+            _toxicity_cache.popitem(last=False)
+
+
+# TextBlob polarity only comes from words and emoticons, and every emoticon in its lexicon
+# contains one of these characters. Text with none of them (emoji, digits) can't score toxic.
+_TOXICITY_SCORABLE = re.compile(r"[^\W\d_]|[:;=<>()\[\]{}\u2665]")
+
+
+def _may_be_toxic(sentence: str) -> bool:
+    return _TOXICITY_SCORABLE.search(sentence) is not None
+
+
+def _blob_polarity(sentence: str) -> Optional[float]:
+    """
+    TextBlob polarity of a message, or None if textblob is not installed.
+    
+    doc._.blob is TextBlob(doc.text), so this is the polarity spaCy would report, without
+    the NER pass. Both toxic branches need polarity <= MILD_TOXIC_THRESHOLD, so
+    above it the entities can't change the verdict and spaCy is skipped.
+    """
+    if TextBlob is None:
+        return None
+    return TextBlob(sentence).sentiment.polarity
+
+
 def toxicity_score(sentence: str) -> Dict[str, Any]:
     """
     Calculate toxicity score using sentiment analysis and entity recognition.
@@ -192,45 +549,27 @@ def toxicity_score(sentence: str) -> Dict[str, Any]:
             raise ValueError("Input must be a non-empty string")
 
         if nlp is None:
+            # Still loading (see /ready) or failed to load; skipped tells callers it wasn't scored
             logger.warning({
                 "event": "toxicity_score",
-                "fallback": "spaCy not loaded — polarity/entity skipped"
+                "fallback": "spaCy not loaded — polarity/entity skipped",
+                "nlp_ready": nlp_ready.is_set()
             })
-            return {'toxic': False, 'polarity': 0, 'entity_count': 0, 'detected_entities': []}
-
-        doc = nlp(sentence)
-        polarity = doc._.blob.polarity
-        # Detect entities that may indicate context worth flagging
-        detected_entities = [
-            ent.label_ for ent in doc.ents
-            if ent.label_ in ['FAC', 'CARDINAL', 'LOC', 'PERSON', 'ORG']
-        ]
-        entity_count = len(detected_entities)
-
-        # Nuanced threshold with reduced false positives:
-        # - Strongly negative overall sentiment is toxic.
-        # - Moderately negative sentiment is toxic only when multiple entities are involved.
-        strong_toxic_threshold = -0.4
-        mild_toxic_threshold = -0.2
-        min_entities_for_mild = 3
-
-        is_toxic = (polarity <= strong_toxic_threshold) or (
-            entity_count >= min_entities_for_mild and polarity <= mild_toxic_threshold
-        )
-
-        logger.info({
-            "event": "toxicity_score",
-            "polarity": polarity,
-            "entities": entity_count
-            # Entity details omitted from logs to protect privacy
-        })
-
-        return {
-            'toxic': is_toxic,
-            'polarity': polarity,
-            'entity_count': entity_count,
-            'detected_entities': detected_entities
-        }
+            return _toxicity_skipped()
+
+        if not _may_be_toxic(sentence):
+            return _toxicity_skipped()
+
+        key = _toxicity_key(sentence)
+        result = _cached_toxicity(key)
+        if result is None:
+            polarity = _blob_polarity(sentence)
+            if polarity is not None and polarity > MILD_TOXIC_THRESHOLD:
+                result = _toxicity_skipped(polarity)
+            else:
+                result = _toxicity_from_doc(nlp(sentence), polarity)
+            _cache_toxicity(key, result)
+        return result
 
     except ValueError as e:
         logger.error({
@@ -245,7 +584,81 @@ def toxicity_score(sentence: str) -> Dict[str, Any]:
         return {'toxic': False, 'polarity': 0, 'entity_count': 0, 'detected_entities': []}
 
 
+# A keyword hit already blocks the message, so spaCy is skipped for it unless full scans are requested
+LUNA_FULL_SCAN = os.environ.get('LUNA_FULL_SCAN', 'false').lower() in ('1', 'true')
+
+
+def _toxicity_skipped(polarity: float = 0) -> Dict[str, Any]:
+    """toxicity_score-shaped result for a message spaCy was not run on."""
+    return {'toxic': False, 'polarity': polarity, 'entity_count': 0, 'detected_entities': [], 'skipped': True}
+
+
+def toxicity_score_batch(sentences: list) -> list:
+    """
+    Score many messages in one spaCy nlp.pipe() call.
+    
+    Args:
+        sentences: Texts to analyze
+        
+    Returns:
+        List of toxicity_score-shaped dicts, in input order. Empty or
+        non-string entries get the non-toxic default, like toxicity_score.
+    """
+    results = [
+        {'toxic': False, 'polarity': 0, 'entity_count': 0, 'detected_entities': []}
+        for _ in sentences
+    ]
+    indexed = [(i, s) for i, s in enumerate(sentences) if isinstance(s, str) and s.strip()]
+    if not indexed:
+        return results
+
+    if nlp is None:
+        logger.warning({
+            "event": "toxicity_score_batch",
+            "fallback": "spaCy not loaded — polarity/entity skipped",
+            "nlp_ready": nlp_ready.is_set()
+        })
+        for i, _ in indexed:
+            results[i] = _toxicity_skipped()
+        return results
+
+    try:
+        misses = []
+        for i, s in indexed:
+            if not _may_be_toxic(s):
+                results[i] = _toxicity_skipped()
+                continue
+            key = _toxicity_key(s)
+            result = _cached_toxicity(key)
+            if result is not None:
+                results[i] = result
+                continue
+            polarity = _blob_polarity(s)
+            if polarity is not None and polarity > MILD_TOXIC_THRESHOLD:
+                results[i] = _toxicity_skipped(polarity)
+                _cache_toxicity(key, results[i])
+            else:
+                misses.append((i, s, key, polarity))
+        docs = nlp.pipe((s for _, s, _, _ in misses), batch_size=LUNA_SPACY_BATCH)
+        for (i, _, key, polarity), doc in zip(misses, docs):
+            results[i] = _toxicity_from_doc(doc, polarity)
+            _cache_toxicity(key, results[i])
+    except Exception as e:
+        logger.error({"event": "toxicity_score_batch", "error": str(e)})
+    return results
+
+
 # 3. Geofence: Haversine with configurable safe zones (validation + logging)
+SAFE_LAT_DEFAULT, SAFE_LON_DEFAULT = 42.3314, -83.0458
+_SAFE_LAT_R = radians(SAFE_LAT_DEFAULT)
+_SAFE_LON_R = radians(SAFE_LON_DEFAULT)
+_COS_SAFE_LAT = cos(_SAFE_LAT_R)
+_KM_PER_DEG = 6371 * pi / 180  # Great-circle km per degree of arc
+_BBOX_MARGIN = 0.05  # Relative band around the radius left to the exact haversine
+_FLAT_MAX_RADIUS_KM = 100  # Zones small enough for the equirectangular estimate
+_FLAT_MAX_LAT = 80  # Beyond this the meridians converge too fast for a flat estimate
+
+
 def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculate the great circle distance between two points on Earth.
@@ -261,11 +674,11 @@ def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 
     try:
         lat1, lon1, lat2, lon2 = map(float, [lat1, lon1, lat2, lon2])  # Validate numerics
-        dlat = radians(lat2 - lat1)
-        dlon = radians(lon2 - lon1)
-        a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-        return R * c
+        rlat1 = radians(lat1)
+        rlat2 = radians(lat2)
+        a = sin((rlat2 - rlat1) * 0.5)**2 + cos(rlat1) * cos(rlat2) * sin(radians(lon2 - lon1) * 0.5)**2
+        # Clamp rounding overshoot at antipodes so asin stays in its domain
+        return 2 * R * asin(sqrt(min(a, 1.0)))
 
     except ValueError:
         logger.error({
@@ -276,12 +689,71 @@ def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         raise ValueError("Invalid coordinates")
 
 
+def _haversine_default(lat: float, lon: float) -> float:
+    """
+    Distance in kilometers from an already-validated point to the default safe zone center.
+    
+    Same formula as haversine(), with the center's radians and cosine taken once at import.
+    """
+    lat_r = radians(lat)
+    dlat = lat_r - _SAFE_LAT_R
+    dlon = radians(lon) - _SAFE_LON_R
+    a = sin(dlat * 0.5)**2 + cos(lat_r) * _COS_SAFE_LAT * sin(dlon * 0.5)**2
+    return 12742.0 * asin(sqrt(min(a, 1.0)))  # 2 * R
+
+
+def _bbox_prefilter(lat: float, lon: float, zone_lat: float, zone_lon: float, radius_km: float) -> Optional[bool]:
+    """
+    Cheap bounds check that settles most geofence pings without trigonometry.
+    
+    The latitude gap alone is a lower bound on the distance, and walking the meridian
+    then the zone's parallel is an upper bound, so both shortcuts are exact. Points
+    left over in small zones get a flat-earth (equirectangular) estimate, trusted
+    only outside the +/-5% band around the radius.
+    
+    Returns:
+        True if provably outside the zone, False if provably inside, None if too close to call
+    """
+    dlat_km = abs(lat - zone_lat) * _KM_PER_DEG
+    if dlat_km > radius_km * (1 + _BBOX_MARGIN):
+        return True
+
+    dlon = abs(lon - zone_lon)
+    if dlon > 180:
+        dlon = 360 - dlon
+    cos_zone_lat = _COS_SAFE_LAT if zone_lat == SAFE_LAT_DEFAULT else cos(radians(zone_lat))
+    if dlat_km + dlon * _KM_PER_DEG * cos_zone_lat < radius_km * (1 - _BBOX_MARGIN):
+        return False
+
+    # Small zones away from the poles: the equirectangular estimate is well inside
+    # the margin, bracketed by the cosines of the two latitudes.
+    if radius_km <= _FLAT_MAX_RADIUS_KM and abs(zone_lat) < _FLAT_MAX_LAT:
+        cos_lat = cos(radians(lat))
+        dlat_sq = dlat_km * dlat_km
+        wide = dlon * _KM_PER_DEG * max(cos_zone_lat, cos_lat)
+        if dlat_sq + wide * wide < (radius_km * (1 - _BBOX_MARGIN)) ** 2:
+            return False
+        narrow = dlon * _KM_PER_DEG * min(cos_zone_lat, cos_lat)
+        if dlat_sq + narrow * narrow > (radius_km * (1 + _BBOX_MARGIN)) ** 2:
+            return True
+
+    return None
+
+
+def _valid_zone_list(safe_zones) -> bool:
+    """
+    A usable safe_zones value is a non-empty list of dicts. Anything else is a broken
+    configuration and gets the safe default (no alert); dicts missing keys are skipped.
+    """
+    return isinstance(safe_zones, list) and len(safe_zones) > 0 and all(isinstance(z, dict) for z in safe_zones)
+
+
 def is_out_of_bounds(
     lat: float,
     lon: float,
     safe_zones: Optional[list] = None,
-    safe_lat: float = 42.3314,
-    safe_lon: float = -83.0458,
+    safe_lat: float = SAFE_LAT_DEFAULT,
+    safe_lon: float = SAFE_LON_DEFAULT,
     radius_km: float = 5
 ) -> bool:
     """
@@ -312,7 +784,7 @@ def is_out_of_bounds(
             safe_zones = [{'lat': safe_lat, 'lon': safe_lon, 'radius_km': radius_km, 'name': 'Default'}]
         
         # Validate safe zones structure
-        if not isinstance(safe_zones, list) or len(safe_zones) == 0:
+        if not _valid_zone_list(safe_zones):
             logger.error({
                 "event": "geofence",
                 "error": "Invalid safe_zones configuration",
@@ -322,6 +794,7 @@ def is_out_of_bounds(
         
         min_distance = float('inf')
         closest_zone = None
+        prefiltered = 0
         
         # Check if inside any safe zone
         for zone in safe_zones:
@@ -335,7 +808,25 @@ def is_out_of_bounds(
                     })
                     continue
                 
-                dist = haversine(lat, lon, zone['lat'], zone['lon'])
+                zone_lat, zone_lon = float(zone['lat']), float(zone['lon'])
+                quick = _bbox_prefilter(lat, lon, zone_lat, zone_lon, zone['radius_km'])
+                if quick is True:
+                    prefiltered += 1
+                    continue
+                if quick is False:
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info({
+                            "event": "geofence",
+                            "zone": zone.get('name', 'unnamed'),
+                            "prefilter": True,
+                            "out_of_bounds": False
+                        })
+                    return False
+
+                if zone_lat == SAFE_LAT_DEFAULT and zone_lon == SAFE_LON_DEFAULT:
+                    dist = _haversine_default(lat, lon)
+                else:
+                    dist = haversine(lat, lon, zone_lat, zone_lon)
                 
                 if dist < min_distance:
                     min_distance = dist
@@ -343,12 +834,13 @@ def is_out_of_bounds(
                 
                 # Inside this zone - location is safe
                 if dist <= zone['radius_km']:
-                    logger.info({
-                        "event": "geofence",
-                        "distance": dist,
-                        "zone": zone.get('name', 'unnamed'),
-                        "out_of_bounds": False
-                    })
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info({
+                            "event": "geofence",
+                            "distance": dist,
+                            "zone": zone.get('name', 'unnamed'),
+                            "out_of_bounds": False
+                        })
                     return False
             
             except (ValueError, TypeError, KeyError) as e:
@@ -361,12 +853,14 @@ def is_out_of_bounds(
                 continue
         
         # Outside all zones
-        logger.info({
-            "event": "geofence",
-            "distance_to_nearest": min_distance,
-            "nearest_zone": closest_zone,
-            "out_of_bounds": True
-        })
+        if logger.isEnabledFor(logging.INFO):
+            logger.info({
+                "event": "geofence",
+                "distance_to_nearest": min_distance,
+                "nearest_zone": closest_zone,
+                "prefiltered_zones": prefiltered,
+                "out_of_bounds": True
+            })
         return True
 
     except ValueError as e:
@@ -378,6 +872,92 @@ def is_out_of_bounds(
         return False
 
 
+def haversine_vec(lats, lons, safe_lat: float, safe_lon: float, R: float = 6371.0):
+    """
+    Vectorized haversine: distance in km from every (lats[i], lons[i]) to one center.
+    
+    Args:
+        lats, lons: Sequences or arrays of coordinates in degrees
+        safe_lat, safe_lon: Zone center
+        R: Earth radius in kilometers
+        
+    Returns:
+        numpy array of distances in kilometers
+    """
+    lats_r = np.radians(lats)
+    slat_r = radians(safe_lat)
+    dlon = np.radians(lons) - radians(safe_lon)
+    # Reduced-trig form of the haversine: cos(d/R) = cos(dlat) - cos(lat1)cos(lat2)(1 - cos(dlon)).
+    # One arccos replaces two squared sines, a sqrt and an arcsin; precision near d = 0 is ~0.1 m.
+    cos_c = np.cos(lats_r - slat_r) - np.cos(lats_r) * cos(slat_r) * (1.0 - np.cos(dlon))
+    return R * np.arccos(np.clip(cos_c, -1.0, 1.0))
+
+
+def out_of_bounds_mask(
+    lats: list,
+    lons: list,
+    safe_zones: Optional[list] = None,
+    safe_lat: float = SAFE_LAT_DEFAULT,
+    safe_lon: float = SAFE_LON_DEFAULT,
+    radius_km: float = 5
+) -> list:
+    """
+    is_out_of_bounds for many points at once, one numpy pass per safe zone.
+    
+    Args:
+        lats, lons: Point coordinates (same length)
+        safe_zones, safe_lat, safe_lon, radius_km: As for is_out_of_bounds
+        
+    Returns:
+        List of booleans, True where the point is outside every safe zone
+    """
+    if np is None:
+        return [
+            is_out_of_bounds(lat, lon, safe_zones, safe_lat, safe_lon, radius_km)
+            for lat, lon in zip(lats, lons)
+        ]
+
+    if safe_zones is None:
+        safe_zones = [{'lat': safe_lat, 'lon': safe_lon, 'radius_km': radius_km, 'name': 'Default'}]
+    if not _valid_zone_list(safe_zones):
+        logger.error({
+            "event": "geofence_batch",
+            "error": "Invalid safe_zones configuration",
+            "type": type(safe_zones).__name__
+        })
+        return [False] * len(lats)  # Safe default, as in is_out_of_bounds
+
+    lat_arr = np.asarray(lats, dtype=float)
+    lon_arr = np.asarray(lons, dtype=float)
+    # Invalid coordinates never alert, matching is_out_of_bounds
+    valid = (lat_arr >= -90) & (lat_arr <= 90) & (lon_arr >= -180) & (lon_arr <= 180)
+    inside = np.zeros(lat_arr.shape, dtype=bool)
+
+    skipped = 0
+    for zone in safe_zones:
+        try:
+            if not all(k in zone for k in ['lat', 'lon', 'radius_km']):
+                skipped += 1
+                continue
+            radius = zone['radius_km']
+            if not isinstance(radius, (int, float)):
+                raise TypeError("radius_km must be numeric")
+            inside |= haversine_vec(lat_arr, lon_arr, float(zone['lat']), float(zone['lon'])) <= radius
+        except (ValueError, TypeError, KeyError):
+            skipped += 1
+
+    out = valid & ~inside
+    if logger.isEnabledFor(logging.INFO):
+        logger.info({
+            "event": "geofence_batch",
+            "points": len(lats),
+            "zones": len(safe_zones),
+            "skipped_zones": skipped,
+            "out_of_bounds": int(out.sum())
+        })
+    return out.tolist()
+
+
 # 4. Send Alert: Async Firebase with mock fallback, rate limited
 # Thread-safe circuit breaker state tracking
 _alert_circuit_breaker = {
@@ -390,6 +970,50 @@ _alert_circuit_breaker = {
 _circuit_breaker_lock = Lock()  # Thread safety for circuit breaker state
 
 
+# Short-window dedup: identical alerts to one parent within the window are sent once
+ALERT_DEDUP_SECONDS = float(os.environ.get('LUNA_ALERT_DEDUP_SECONDS', '30'))
+ALERT_DEDUP_MAX_ENTRIES = 10000
+_alert_dedup: OrderedDict = OrderedDict()  # (parent_token, alert_msg) -> monotonic expiry
+_alert_dedup_lock = Lock()
+
+
+def _alert_recently_sent(parent_token: str, alert_msg: str) -> bool:
+    """
+    Record an alert and report whether the same one already went out within the dedup window.
+    
+    Returns:
+        True if this alert should be skipped as a duplicate
+    """
+    if ALERT_DEDUP_SECONDS <= 0:
+        return False
+    key = (parent_token, alert_msg)
+    now = time.monotonic()
+    with _alert_dedup_lock:
+        # Entries are kept in expiry order, so expired ones sit at the front
+        while _alert_dedup and next(iter(_alert_dedup.values())) <= now:
+            _alert_dedup.popitem(last=False)
+        if key in _alert_dedup:
+            return True
+        _alert_dedup[key] = now + ALERT_DEDUP_SECONDS
+        if len(_alert_dedup) > ALERT_DEDUP_MAX_ENTRIES:
+            _alert_dedup.popitem(last=False)
+    return False
+
+
+def _forget_alert(parent_token: str, alert_msg: str) -> None:
+    """Drop a dedup entry so a failed alert can be retried inside the window."""
+    with _alert_dedup_lock:
+        _alert_dedup.pop((parent_token, alert_msg), None)
+
+
+# Persistent workers for alert delivery: no thread spawn per alert, and bursts queue up instead of fanning out
+_ALERT_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('LUNA_ALERT_WORKERS', '8')),
+    thread_name_prefix='luna-alert'
+)
+atexit.register(_ALERT_POOL.shutdown, wait=False, cancel_futures=True)
+
+
 def send_alert_async(parent_token: str, alert_msg: str) -> str:
     """
     Send alert asynchronously via Firebase Cloud Messaging with circuit breaker pattern.
@@ -423,11 +1047,15 @@ def send_alert_async(parent_token: str, alert_msg: str) -> str:
                     logger.info({"event": "alert_circuit_reset", "message": "Circuit breaker reset"})
     
     def _send() -> None:
-        """Internal function to send alert in background thread with error tracking."""
+        """Internal function to send alert on an alert worker with error tracking."""
         if not firebase_admin._apps:
             logger.warning({"event": "mock_alert", "message": alert_msg})
             return
 
+        if _alert_recently_sent(parent_token, alert_msg):
+            logger.info({"event": "alert_deduped", "window_seconds": ALERT_DEDUP_SECONDS})
+            return
+
         message = messaging.Message(
             notification=messaging.Notification(title='Luna Alert!', body=alert_msg),
             token=parent_token
@@ -441,6 +1069,7 @@ def send_alert_async(parent_token: str, alert_msg: str) -> str:
                 _alert_circuit_breaker['failure_count'] = 0
 
         except Exception as e:
+            _forget_alert(parent_token, alert_msg)
             # Track failures for circuit breaker (thread-safe)
             with _circuit_breaker_lock:
                 _alert_circuit_breaker['failure_count'] += 1
@@ -461,13 +1090,50 @@ def send_alert_async(parent_token: str, alert_msg: str) -> str:
                     "failure_count": _alert_circuit_breaker['failure_count']
                 })
 
-    # Use daemon thread to prevent hanging on app shutdown
-    thread = Thread(target=_send, daemon=True)
-    thread.start()
+    _ALERT_POOL.submit(_send)
     return 'Alert dispatching...'
 
 
 # JWT Token Verification Middleware  
+# Verified token -> (user, cache expiry). Bounded LRU so a chatty device's repeat requests
+# skip the HMAC verify; entries never outlive the token's own exp.
+TOKEN_CACHE_SIZE = int(os.environ.get('LUNA_TOKEN_CACHE_SIZE', '10000'))
+TOKEN_CACHE_TTL = float(os.environ.get('LUNA_TOKEN_CACHE_TTL', '300'))
+JWT_ALGORITHMS = ['HS256']  # Pinned: no algorithm negotiation from the token header
+MAX_TOKEN_LENGTH = 4096  # /auth_kid tokens are ~150 bytes (user_id is capped at 100 characters)
+_token_cache: OrderedDict = OrderedDict()
+_token_cache_lock = Lock()
+
+
+def _token_key(token: str) -> bytes:
+    # Bearer tokens are kept out of the cache; a 16-byte digest identifies them
+    return hashlib.blake2b(token.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def _cached_token_user(key: bytes) -> Optional[str]:
+    with _token_cache_lock:
+        hit = _token_cache.get(key)
+        if hit is None:
+            return None
+        user, expires_at = hit
+        if expires_at <= time.time():
+            del _token_cache[key]
+            return None
+        _token_cache.move_to_end(key)
+        return user
+
+
+def _cache_token_user(key: bytes, user: str, exp) -> None:
+    if not TOKEN_CACHE_SIZE or not isinstance(exp, (int, float)):
+        return
+    expires_at = min(float(exp), time.time() + TOKEN_CACHE_TTL)
+    with _token_cache_lock:
+        _token_cache[key] = (user, expires_at)
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+
 def verify_token() -> Tuple[Optional[str], Optional[Tuple[Response, int]]]:
     """
     Verify JWT token from Authorization header.
@@ -480,9 +1146,20 @@ def verify_token() -> Tuple[Optional[str], Optional[Tuple[Response, int]]]:
     if not token:
         return None, (jsonify({'error': 'Missing token'}), 401)
 
+    # Anything that isn't header.payload.signature can't verify; skip hashing and HMAC for it
+    if len(token) > MAX_TOKEN_LENGTH or token.count('.') != 2:
+        return None, (jsonify({'error': 'Invalid token'}), 401)
+
+    key = _token_key(token)
+    user = _cached_token_user(key)
+    if user is not None:
+        return user, None
+
     try:
-        decoded = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-        return decoded['user'], None
+        decoded = jwt.decode(token, SECRET_KEY, algorithms=JWT_ALGORITHMS)
+        user = decoded['user']
+        _cache_token_user(key, user, decoded.get('exp'))
+        return user, None
 
     except jwt.ExpiredSignatureError:
         return None, (jsonify({'error': 'Token expired'}), 401)
@@ -502,6 +1179,17 @@ def verify_token() -> Tuple[Optional[str], Optional[Tuple[Response, int]]]:
 
 # API Routes with Limiter & Validation
 
+# Per-message character cap for /check_chat and /check_chat_batch. JSON escapes one character
+# to at most 12 bytes (a \uXXXX surrogate pair), so a body declaring more than this many bytes
+# per message can't hold a valid request and is refused before token verification or parsing.
+MAX_MESSAGE_LENGTH = 10000
+MAX_CHAT_BODY_BYTES = 12 * MAX_MESSAGE_LENGTH + 8192  # Slack for parent_token and JSON framing
+
+
+def _declared_body_too_large(limit: int) -> bool:
+    """True if the Content-Length header alone rules the request out."""
+    return (request.content_length or 0) > limit
+
 @app.route('/check_chat', methods=['POST'])
 @limiter.limit("10/minute")  # Rate limit to prevent spam
 def check_incoming() -> Tuple[Response, int]:
@@ -515,10 +1203,20 @@ def check_incoming() -> Tuple[Response, int]:
     Returns:
         JSON with blocked/safe status and details
     """
-    request_id = str(uuid.uuid4())[:8]
-    start_time = datetime.now(timezone.utc)
+    request_id = _request_id()
+    start_ns = time.perf_counter_ns()
     
     try:
+        # Oversized bodies are refused from the header, before any HMAC or JSON work
+        if _declared_body_too_large(MAX_CHAT_BODY_BYTES):
+            logger.warning({
+                "event": "check_chat",
+                "request_id": request_id,
+                "error": "Request too large",
+                "content_length": request.content_length
+            })
+            return jsonify({'error': f'Message too large (max {MAX_MESSAGE_LENGTH} characters)'}), 413
+
         # Auth check - using new verify_token pattern
         user, error_response = verify_token()
         if error_response:
@@ -551,25 +1249,27 @@ def check_incoming() -> Tuple[Response, int]:
             return jsonify({'error': 'Missing message or parent_token'}), 400
 
         # Input size validation to prevent DoS attacks
-        max_message_length = 10000  # 10KB max
-        if len(text) > max_message_length:
+        if len(text) > MAX_MESSAGE_LENGTH:
             logger.warning({
                 "event": "check_chat",
                 "request_id": request_id,
                 "error": "Message too large",
                 "length": len(text)
             })
-            return jsonify({'error': f'Message too large (max {max_message_length} characters)'}), 400
+            return jsonify({'error': f'Message too large (max {MAX_MESSAGE_LENGTH} characters)'}), 400
 
         flag1 = scan_message(text)
-        flag2 = toxicity_score(text)
+        if flag1['is_flagged'] and not LUNA_FULL_SCAN:
+            flag2 = _toxicity_skipped()
+        else:
+            flag2 = toxicity_score(text)
 
         if flag1['is_flagged'] or flag2['toxic']:
             # Generalized alert message - omit sensitive message content for privacy
             alert_msg = "Suspicious chat activity detected."
             status = send_alert_async(parent_token, alert_msg)
             
-            elapsed_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+            elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
             logger.info({
                 "event": "check_chat",
                 "request_id": request_id,
@@ -587,7 +1287,7 @@ def check_incoming() -> Tuple[Response, int]:
                 'status': status
             }), 200
 
-        elapsed_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
         logger.info({
             "event": "check_chat",
             "request_id": request_id,
@@ -599,7 +1299,7 @@ def check_incoming() -> Tuple[Response, int]:
         return jsonify({'safe': True}), 200
 
     except ValueError as e:
-        elapsed_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
         logger.error({
             "event": "check_chat",
             "request_id": request_id,
@@ -609,7 +1309,7 @@ def check_incoming() -> Tuple[Response, int]:
         })
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        elapsed_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
         logger.error({
             "event": "check_chat",
             "request_id": request_id,
@@ -620,6 +1320,143 @@ def check_incoming() -> Tuple[Response, int]:
         return jsonify({'error': 'Internal error'}), 500
 
 
+MAX_CHAT_BATCH = int(os.environ.get('LUNA_MAX_CHAT_BATCH', '100'))
+
+
+@app.route('/check_chat_batch', methods=['POST'])
+@limiter.limit("10/minute")
+def check_incoming_batch() -> Tuple[Response, int]:
+    """
+    Check a buffer of chat messages (e.g. a device catching up after being offline).
+    
+    Request JSON:
+        messages: List of chat message texts
+        parent_token: Firebase device token for alerts
+        
+    Returns:
+        JSON with one /check_chat-shaped result per message; at most one alert is sent
+    """
+    request_id = _request_id()
+    start_ns = time.perf_counter_ns()
+    
+    try:
+        if _declared_body_too_large(MAX_CHAT_BATCH * MAX_CHAT_BODY_BYTES):
+            logger.warning({
+                "event": "check_chat_batch",
+                "request_id": request_id,
+                "error": "Request too large",
+                "content_length": request.content_length
+            })
+            return jsonify({'error': 'Request too large'}), 413
+
+        user, error_response = verify_token()
+        if error_response:
+            logger.warning({
+                "event": "check_chat_batch",
+                "request_id": request_id,
+                "status": "unauthorized"
+            })
+            return error_response
+
+        if not request.is_json:
+            logger.warning({
+                "event": "check_chat_batch",
+                "request_id": request_id,
+                "error": "Invalid content type"
+            })
+            return jsonify({'error': 'Content-Type must be application/json'}), 400
+
+        data = request.json or {}
+        messages = data.get('messages')
+        parent_token = data.get('parent_token', '').strip()
+
+        if not isinstance(messages, list) or not messages or not parent_token:
+            logger.warning({
+                "event": "check_chat_batch",
+                "request_id": request_id,
+                "error": "Missing required fields"
+            })
+            return jsonify({'error': 'Missing messages list or parent_token'}), 400
+
+        if len(messages) > MAX_CHAT_BATCH:
+            return jsonify({'error': f'Too many messages (max {MAX_CHAT_BATCH})'}), 400
+
+        texts = []
+        for index, message in enumerate(messages):
+            text = message.strip() if isinstance(message, str) else ''
+            if not text or len(text) > MAX_MESSAGE_LENGTH:
+                logger.warning({
+                    "event": "check_chat_batch",
+                    "request_id": request_id,
+                    "error": "Invalid message",
+                    "index": index
+                })
+                return jsonify({
+                    'error': f'Each message must be a non-empty string (max {MAX_MESSAGE_LENGTH} characters)',
+                    'index': index
+                }), 400
+            texts.append(text)
+
+        danger = [scan_message(text) for text in texts]
+        if LUNA_FULL_SCAN:
+            toxicity = toxicity_score_batch(texts)
+        else:
+            # Only messages the keyword scan passed go through nlp.pipe()
+            toxicity = [_toxicity_skipped() if flag1['is_flagged'] else None for flag1 in danger]
+            pending = [i for i, flag2 in enumerate(toxicity) if flag2 is None]
+            for i, flag2 in zip(pending, toxicity_score_batch([texts[i] for i in pending])):
+                toxicity[i] = flag2
+        results = []
+        blocked_count = 0
+        for flag1, flag2 in zip(danger, toxicity):
+            if flag1['is_flagged'] or flag2['toxic']:
+                blocked_count += 1
+                results.append({
+                    'blocked': True,
+                    'reason': 'potential threat',
+                    'details': {'danger': flag1, 'toxicity': flag2}
+                })
+            else:
+                results.append({'safe': True})
+
+        status = None
+        if blocked_count:
+            # One generalized alert per batch - omit message content for privacy
+            status = send_alert_async(parent_token, "Suspicious chat activity detected.")
+
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+        logger.info({
+            "event": "check_chat_batch",
+            "request_id": request_id,
+            "user": user,
+            "messages": len(texts),
+            "blocked": blocked_count,
+            "response_time_ms": elapsed_ms
+        })
+
+        return jsonify({
+            'results': results,
+            'blocked_count': blocked_count,
+            'status': status
+        }), 200
+
+    except Exception as e:
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+        logger.error({
+            "event": "check_chat_batch",
+            "request_id": request_id,
+            "error": str(e),
+            "error_type": type(e).__name__,
+            "response_time_ms": elapsed_ms
+        })
+        return jsonify({'error': 'Internal error'}), 500
+
+
+# A ping is a few hundred bytes even with a handful of safe_zones; anything declaring more than
+# this is refused before token verification or parsing
+MAX_LOCATION_BODY_BYTES = int(os.environ.get('LUNA_MAX_LOCATION_BODY_BYTES', '65536'))
+
+
 @app.route('/check_location', methods=['POST'])
 @limiter.limit("20/minute")
 def track_location() -> Tuple[Response, int]:
@@ -635,10 +1472,19 @@ def track_location() -> Tuple[Response, int]:
     Returns:
         JSON with alert/safe status
     """
-    request_id = str(uuid.uuid4())[:8]
-    start_time = datetime.now(timezone.utc)
+    request_id = _request_id()
+    start_ns = time.perf_counter_ns()
     
     try:
+        if _declared_body_too_large(MAX_LOCATION_BODY_BYTES):
+            logger.warning({
+                "event": "check_location",
+                "request_id": request_id,
+                "error": "Request too large",
+                "content_length": request.content_length
+            })
+            return jsonify({'error': f'Request too large (max {MAX_LOCATION_BODY_BYTES} bytes)'}), 413
+
         # Auth check - using new verify_token pattern
         user, error_response = verify_token()
         if error_response:
@@ -691,7 +1537,7 @@ def track_location() -> Tuple[Response, int]:
                 "Child outside safe zone! Location details omitted for privacy."
             )
             
-            elapsed_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+            elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
             logger.info({
                 "event": "check_location",
                 "request_id": request_id,
@@ -702,7 +1548,7 @@ def track_location() -> Tuple[Response, int]:
             
             return jsonify({'alert': 'Outside safe zone', 'status': status}), 200
 
-        elapsed_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
         logger.info({
             "event": "check_location",
             "request_id": request_id,
@@ -714,7 +1560,7 @@ def track_location() -> Tuple[Response, int]:
         return jsonify({'safe': True}), 200
 
     except ValueError as e:
-        elapsed_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
         logger.error({
             "event": "check_location",
             "request_id": request_id,
@@ -724,7 +1570,7 @@ def track_location() -> Tuple[Response, int]:
         })
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        elapsed_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
         logger.error({
             "event": "check_location",
             "request_id": request_id,
@@ -735,6 +1581,172 @@ def track_location() -> Tuple[Response, int]:
         return jsonify({'error': 'Internal error'}), 500
 
 
+MAX_LOCATION_BATCH = int(os.environ.get('LUNA_MAX_LOCATION_BATCH', '1000'))
+# A point is at most two 17-digit floats plus brackets and separators (well under 64 bytes);
+# the rest of the body gets the same allowance as a single /check_location request
+MAX_LOCATION_POINT_BYTES = 64
+MAX_LOCATION_BATCH_BODY_BYTES = MAX_LOCATION_BATCH * MAX_LOCATION_POINT_BYTES + MAX_LOCATION_BODY_BYTES
+
+
+def _coordinate_columns(lats: list, lons: list):
+    """
+    Contiguous float64 arrays for the lats/lons form of /check_location_batch.
+    
+    Flat lists convert in one numpy call each; nested [lat, lon] points do not
+    (numpy's nested-list conversion is slower than the per-point loop), so the
+    points form keeps the loop in track_location_batch.
+    
+    Returns:
+        Tuple of numpy arrays, or None if numpy is unavailable or an entry needs
+        the per-point validation in track_location_batch
+    """
+    if np is None:
+        return None
+    try:
+        lat_arr = np.asarray(lats, dtype=np.float64)
+        lon_arr = np.asarray(lons, dtype=np.float64)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    if lat_arr.ndim != 1 or lon_arr.ndim != 1:
+        return None
+    # numpy turns None into NaN where float() would reject it
+    if np.isnan(lat_arr).any() or np.isnan(lon_arr).any():
+        return None
+    return lat_arr, lon_arr
+
+
+@app.route('/check_location_batch', methods=['POST'])
+@limiter.limit("20/minute")
+def track_location_batch() -> Tuple[Response, int]:
+    """
+    Check many GPS pings against the geofence (catch-up sync after an offline period).
+    
+    Request JSON:
+        lats, lons: Equal-length lists of coordinates (preferred), or
+        points: List of [lat, lon] pairs
+        parent_token: Firebase device token for alerts
+        safe_zones: Optional list of safe zones, as for /check_location
+        
+    Returns:
+        JSON with a per-point out_of_bounds mask and the first out-of-bounds index
+    """
+    request_id = _request_id()
+    start_ns = time.perf_counter_ns()
+    
+    try:
+        if _declared_body_too_large(MAX_LOCATION_BATCH_BODY_BYTES):
+            logger.warning({
+                "event": "check_location_batch",
+                "request_id": request_id,
+                "error": "Request too large",
+                "content_length": request.content_length
+            })
+            return jsonify({'error': f'Request too large (max {MAX_LOCATION_BATCH_BODY_BYTES} bytes)'}), 413
+
+        user, error_response = verify_token()
+        if error_response:
+            logger.warning({
+                "event": "check_location_batch",
+                "request_id": request_id,
+                "status": "unauthorized"
+            })
+            return error_response
+
+        if not request.is_json:
+            logger.warning({
+                "event": "check_location_batch",
+                "request_id": request_id,
+                "error": "Invalid content type"
+            })
+            return jsonify({'error': 'Content-Type must be application/json'}), 400
+
+        data = request.json or {}
+        parent_token = data.get('parent_token', '')
+        safe_zones = data.get('safe_zones')
+
+        if 'lats' in data or 'lons' in data:
+            lat_list, lon_list = data.get('lats'), data.get('lons')
+            if not isinstance(lat_list, list) or not isinstance(lon_list, list) or len(lat_list) != len(lon_list):
+                return jsonify({'error': 'lats and lons must be lists of equal length'}), 400
+            points = None
+            count = len(lat_list)
+        else:
+            points = data.get('points')
+            count = len(points) if isinstance(points, list) else 0
+
+        if not count or not parent_token:
+            logger.warning({
+                "event": "check_location_batch",
+                "request_id": request_id,
+                "error": "Missing required fields"
+            })
+            return jsonify({'error': 'Missing points list or parent_token'}), 400
+
+        if count > MAX_LOCATION_BATCH:
+            return jsonify({'error': f'Too many points (max {MAX_LOCATION_BATCH})'}), 400
+
+        columns = _coordinate_columns(lat_list, lon_list) if points is None else None
+        if columns is not None:
+            lats, lons = columns
+        else:
+            # Per-point validation so the response can name the first bad entry
+            lats = []
+            lons = []
+            pairs = points if points is not None else zip(lat_list, lon_list)
+            for index, point in enumerate(pairs):
+                try:
+                    # An object point passes the length check but would raise KeyError on point[0]
+                    if not isinstance(point, (list, tuple)) or len(point) != 2:
+                        raise ValueError("point must be [lat, lon]")
+                    lats.append(float(point[0]))
+                    lons.append(float(point[1]))
+                except (ValueError, TypeError):
+                    logger.error({
+                        "event": "check_location_batch",
+                        "request_id": request_id,
+                        "error": "Invalid coordinate format",
+                        "index": index
+                    })
+                    return jsonify({'error': 'Invalid coordinate format', 'index': index}), 400
+
+        mask = out_of_bounds_mask(lats, lons, safe_zones=safe_zones)
+        first_out = mask.index(True) if True in mask else None
+
+        response = {'out_of_bounds': mask, 'first_out_of_bounds': first_out}
+        if first_out is not None:
+            # One generalized alert per batch - omit coordinates for privacy
+            response['alert'] = 'Outside safe zone'
+            response['status'] = send_alert_async(
+                parent_token,
+                "Child outside safe zone! Location details omitted for privacy."
+            )
+        else:
+            response['safe'] = True
+
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+        logger.info({
+            "event": "check_location_batch",
+            "request_id": request_id,
+            "user": user,
+            "points": len(mask),
+            "result": "out_of_bounds" if first_out is not None else "safe",
+            "response_time_ms": elapsed_ms
+        })
+
+        return jsonify(response), 200
+
+    except Exception as e:
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+        logger.error({
+            "event": "check_location_batch",
+            "request_id": request_id,
+            "error": str(e),
+            "error_type": type(e).__name__,
+            "response_time_ms": elapsed_ms
+        })
+        return jsonify({'error': 'Internal error'}), 500
+
+
 @app.route('/auth_kid', methods=['GET'])
 @limiter.limit("5/minute")
 def generate_token() -> Tuple[Response, int]:
@@ -747,8 +1759,8 @@ def generate_token() -> Tuple[Response, int]:
     Returns:
         JSON with JWT token
     """
-    request_id = str(uuid.uuid4())[:8]
-    start_time = datetime.now(timezone.utc)
+    request_id = _request_id()
+    start_ns = time.perf_counter_ns()
     
     try:
         user_id = request.args.get('user_id', '').strip()
@@ -762,9 +1774,7 @@ def generate_token() -> Tuple[Response, int]:
             return jsonify({'error': 'Missing user_id'}), 400
 
         # Security: Sanitize user_id to prevent injection attacks
-        # Only allow alphanumeric characters, underscores, hyphens, and dots
-        allowed_chars = string.ascii_letters + string.digits + '_-.'
-        if not all(c in allowed_chars for c in user_id):
+        if not _USER_ID_CHARS.fullmatch(user_id):
             logger.warning({
                 "event": "auth_kid",
                 "request_id": request_id,
@@ -787,7 +1797,7 @@ def generate_token() -> Tuple[Response, int]:
         }
         token = jwt.encode(payload, SECRET_KEY, algorithm='HS256')
 
-        elapsed_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
         logger.info({
             "event": "token_generated",
             "request_id": request_id,
@@ -798,7 +1808,7 @@ def generate_token() -> Tuple[Response, int]:
         return jsonify({'token': token}), 200
 
     except ValueError as e:
-        elapsed_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
         logger.error({
             "event": "auth_kid",
             "request_id": request_id,
@@ -808,7 +1818,7 @@ def generate_token() -> Tuple[Response, int]:
         })
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        elapsed_ms = (datetime.now(timezone.utc) - start_time).total_seconds() * 1000
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
         logger.error({
             "event": "auth_kid",
             "request_id": request_id,
@@ -819,6 +1829,20 @@ def generate_token() -> Tuple[Response, int]:
         return jsonify({'error': 'Token generation failed'}), 500
 
 
+@app.route('/ready', methods=['GET'])
+@limiter.exempt
+def readiness() -> Tuple[Response, int]:
+    """
+    Readiness probe: 503 until the background spaCy load has finished.
+    
+    Returns:
+        JSON with ready and nlp (False if spaCy failed to load and toxicity scoring is off)
+    """
+    if not nlp_ready.is_set():
+        return jsonify({'ready': False, 'nlp': False}), 503
+    return jsonify({'ready': True, 'nlp': nlp is not None}), 200
+
+
 # Import unittest here for test class to avoid polluting main module namespace
 import unittest
 
@@ -827,6 +1851,11 @@ import unittest
 class TestLunaSafetyCore(unittest.TestCase):
     """Comprehensive test suite for Luna Safety Core module."""
 
+    @classmethod
+    def setUpClass(cls):
+        """Let the background spaCy load finish so toxicity tests see the final nlp."""
+        nlp_ready.wait(timeout=120)
+
     def setUp(self):
         """Set up test client and generate test token."""
         self.client = app.test_client()
@@ -897,6 +1926,72 @@ class TestLunaSafetyCore(unittest.TestCase):
         result = send_alert_async('mock_token', 'Test alert')
         self.assertEqual(result, 'Alert dispatching...')
 
+    def test_verify_token_caches_valid_tokens_only(self):
+        """Test verified tokens are cached and expired ones are not."""
+        _token_cache.pop(_token_key(self.test_token), None)
+        with app.test_request_context(headers={'Authorization': f'Bearer {self.test_token}'}):
+            self.assertEqual(verify_token(), ('test_user', None))
+        self.assertEqual(_cached_token_user(_token_key(self.test_token)), 'test_user')
+        self.assertNotIn(self.test_token, _token_cache)
+
+        expired = jwt.encode(
+            {'user': 'test_user', 'exp': datetime.now(timezone.utc) - timedelta(seconds=1)},
+            SECRET_KEY, algorithm='HS256'
+        )
+        with app.test_request_context(headers={'Authorization': f'Bearer {expired}'}):
+            user, error_response = verify_token()
+        self.assertIsNone(user)
+        self.assertEqual(error_response[1], 401)
+        self.assertNotIn(_token_key(expired), _token_cache)
+
+    def test_verify_token_rejects_malformed_shape(self):
+        """Test tokens that aren't three dot-separated segments are refused before decoding."""
+        for token in ('invalid_token', 'a.b', 'a.b.c.d', self.test_token + '.' * MAX_TOKEN_LENGTH):
+            with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+                user, error_response = verify_token()
+            self.assertIsNone(user)
+            self.assertEqual(error_response[1], 401)
+            self.assertEqual(error_response[0].get_json(), {'error': 'Invalid token'})
+
+    def test_json_provider_round_trip(self):
+        """Test the app's JSON provider keeps sorted keys and parses request bodies."""
+        if orjson is None:
+            self.skipTest("orjson not installed - Flask's default provider is used")
+        self.assertEqual(app.json.dumps({'b': 1, 'a': [True, None]}), '{"a":[true,null],"b":1}')
+        self.assertEqual(app.json.loads('{"lat": 42.3314}'), {'lat': 42.3314})
+        # Same HTTP-date format as Flask's default provider
+        when = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        self.assertEqual(app.json.dumps({'at': when}), '{"at":"Fri, 02 Jan 2026 03:04:05 GMT"}')
+
+    def test_json_log_formatter(self):
+        """Test log lines are valid JSON with dict messages merged in as fields."""
+        formatter = JSONLogFormatter()
+        record = logging.LogRecord(__name__, logging.INFO, __file__, 0,
+                                   {"event": "scan_message", "matches": 2}, None, None)
+        line = json.loads(formatter.format(record))
+        self.assertEqual(line['level'], 'INFO')
+        self.assertEqual(line['event'], 'scan_message')
+        self.assertEqual(line['matches'], 2)
+        record = logging.LogRecord(__name__, logging.WARNING, __file__, 0,
+                                   'quote " and %s', ('args',), None)
+        self.assertEqual(json.loads(formatter.format(record))['message'], 'quote " and args')
+
+    def test_request_ids_unique(self):
+        """Test back-to-back request ids never repeat and keep the process prefix."""
+        ids = {_request_id() for _ in range(1000)}
+        self.assertEqual(len(ids), 1000)
+        self.assertTrue(all(i.startswith(_REQUEST_ID_BASE) for i in ids))
+
+    def test_alert_dedup_window(self):
+        """Test identical alerts to the same parent are only sent once per window."""
+        self.assertFalse(_alert_recently_sent('dedup_token', 'Test alert'))
+        self.assertTrue(_alert_recently_sent('dedup_token', 'Test alert'))
+        self.assertFalse(_alert_recently_sent('other_token', 'Test alert'))
+        _forget_alert('dedup_token', 'Test alert')
+        self.assertFalse(_alert_recently_sent('dedup_token', 'Test alert'))
+        for token in ('dedup_token', 'other_token'):
+            _forget_alert(token, 'Test alert')
+
     # Endpoint Tests
     def test_check_chat_safe_message(self):
         """Test /check_chat endpoint with safe message."""
@@ -921,6 +2016,8 @@ class TestLunaSafetyCore(unittest.TestCase):
         data = response.get_json()
         self.assertIn('blocked', data)
         self.assertTrue(data['blocked'])
+        # Keyword hit blocks on its own; spaCy is not run unless LUNA_FULL_SCAN is set
+        self.assertEqual(data['details']['toxicity'].get('skipped'), None if LUNA_FULL_SCAN else True)
 
     def test_check_chat_missing_token(self):
         """Test /check_chat endpoint without authentication."""
@@ -958,6 +2055,18 @@ class TestLunaSafetyCore(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 400)
 
+    def test_chat_body_cap_fits_worst_case_message(self):
+        """Test the pre-auth Content-Length cap never refuses a valid /check_chat body."""
+        # ensure_ascii escapes every emoji to a 12-byte surrogate pair, the JSON worst case
+        body = json.dumps({'message': '\U0001F600' * MAX_MESSAGE_LENGTH, 'parent_token': 't' * 300})
+        self.assertLessEqual(len(body.encode()), MAX_CHAT_BODY_BYTES)
+        with app.test_request_context('/check_chat', method='POST', data=body,
+                                      content_type='application/json'):
+            self.assertFalse(_declared_body_too_large(MAX_CHAT_BODY_BYTES))
+        with app.test_request_context('/check_chat', method='POST', data=b' ' * (MAX_CHAT_BODY_BYTES + 1),
+                                      content_type='application/json'):
+            self.assertTrue(_declared_body_too_large(MAX_CHAT_BODY_BYTES))
+
     def test_check_chat_invalid_json(self):
         """Test /check_chat endpoint with non-JSON content."""
         response = self.client.post(
@@ -970,6 +2079,129 @@ class TestLunaSafetyCore(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 400)
 
+    def test_check_chat_batch(self):
+        """Test /check_chat_batch returns one result per message in order."""
+        response = self.client.post(
+            '/check_chat_batch',
+            json={
+                'messages': ['Hello friend, how are you today?', 'Hey sweetie, send me a pic'],
+                'parent_token': 'test_token'
+            },
+            headers={'Authorization': f'Bearer {self.test_token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['blocked_count'], 1)
+        self.assertTrue(data['results'][0]['safe'])
+        self.assertTrue(data['results'][1]['blocked'])
+        self.assertEqual(data['status'], 'Alert dispatching...')
+
+    def test_check_chat_batch_rejects_empty_message(self):
+        """Test /check_chat_batch reports the index of an invalid message."""
+        response = self.client.post(
+            '/check_chat_batch',
+            json={'messages': ['Hello', '  '], 'parent_token': 'test_token'},
+            headers={'Authorization': f'Bearer {self.test_token}'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['index'], 1)
+
+    def test_may_be_toxic_prefilter(self):
+        """Test only text TextBlob could score negatively reaches spaCy."""
+        for text in ("I hate you", "ok", ":(", ">.>", "<3", "pas ça"):
+            self.assertTrue(_may_be_toxic(text), text)
+        for text in ("\U0001F621\U0001F621", "12 34 56", "!!! ...", "\u2764\ufe0f"):
+            self.assertFalse(_may_be_toxic(text), text)
+
+    def test_toxicity_cache_returns_copies(self):
+        """Test cached toxicity results are keyed by message and can't be mutated by callers."""
+        key = _toxicity_key("scripted bot message")
+        self.assertNotEqual(key, _toxicity_key("scripted bot message!"))
+        _cache_toxicity(key, {'toxic': True, 'polarity': -0.5, 'entity_count': 1, 'detected_entities': ['PERSON']})
+        hit = _cached_toxicity(key)
+        hit['detected_entities'].append('LOC')
+        self.assertEqual(_cached_toxicity(key)['detected_entities'], ['PERSON'])
+        _toxicity_cache.pop(key, None)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "needs os.fork")
+    def test_request_ids_unique_across_forks(self):
+        """Test forked workers draw their own request id prefix instead of the master's."""
+        ids = [_request_id()]
+        for _ in range(3):
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                os.write(write_fd, _request_id().encode())
+                os._exit(0)
+            os.close(write_fd)
+            with os.fdopen(read_fd) as pipe:
+                ids.append(pipe.read())
+            os.waitpid(pid, 0)
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(i.endswith('1') for i in ids[1:]))  # Each child restarts its counter
+
+    def test_polarity_gate_skips_spacy(self):
+        """Test messages TextBlob scores above the mild threshold never reach spaCy."""
+        try:
+            from textblob import TextBlob as Blob
+        except ImportError:
+            self.skipTest("textblob not installed - every message goes through spaCy")
+        from types import SimpleNamespace
+        calls = []
+
+        class StubNLP:
+            # Same doc._.blob and doc.ents surface that spacytextblob gives _toxicity_from_doc
+            def __call__(self, text):
+                calls.append(text)
+                return SimpleNamespace(ents=[], _=SimpleNamespace(blob=Blob(text)))
+
+            def pipe(self, texts, batch_size=None):
+                return [self(t) for t in texts]
+
+        # Published together, as _load_nlp does
+        global nlp, TextBlob
+        saved = nlp, TextBlob
+        nlp, TextBlob = StubNLP(), Blob
+        _toxicity_cache.clear()
+        try:
+            texts = ["we had a great day at the park", "see you later", "you are a horrible disgusting person"]
+            results = [toxicity_score(t) for t in texts]
+            self.assertEqual(calls, ["you are a horrible disgusting person"])
+            self.assertEqual([r.get('skipped', False) for r in results], [True, True, False])
+            self.assertEqual([r['toxic'] for r in results], [False, False, True])
+            self.assertEqual(results[0]['polarity'], Blob(texts[0]).sentiment.polarity)
+            _toxicity_cache.clear()
+            self.assertEqual(toxicity_score_batch(texts), results)
+            self.assertEqual(calls, ["you are a horrible disgusting person"] * 2)
+        finally:
+            nlp, TextBlob = saved
+            _toxicity_cache.clear()
+
+    def test_readiness_tracks_spacy_load(self):
+        """Test /ready reports 503 while spaCy loads and unscored results are marked skipped."""
+        global nlp
+        saved = nlp
+        nlp = None
+        nlp_ready.clear()
+        try:
+            response = self.client.get('/ready')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.get_json(), {'ready': False, 'nlp': False})
+            self.assertTrue(toxicity_score("Have a great day!")['skipped'])
+            self.assertTrue(toxicity_score_batch(["Have a great day!"])[0]['skipped'])
+        finally:
+            nlp = saved
+            nlp_ready.set()
+        response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'ready': True, 'nlp': nlp is not None})
+
+    def test_toxicity_score_batch_matches_single(self):
+        """Test batch toxicity scoring agrees with per-message scoring."""
+        texts = ["I hate you, meet at the park (age 12).", "Have a great day!", ""]
+        self.assertEqual(toxicity_score_batch(texts), [toxicity_score(t) for t in texts])
+
     def test_check_location_inside_safe_zone(self):
         """Test /check_location endpoint inside safe zone."""
         response = self.client.post(
@@ -1015,6 +2247,16 @@ class TestLunaSafetyCore(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 400)
 
+    def test_check_location_body_too_large(self):
+        """Test oversized /check_location bodies are refused before the token is checked."""
+        zone = {'lat': 42.2808, 'lon': -83.7430, 'radius_km': 5, 'name': 'Home'}
+        zones = [zone] * (MAX_LOCATION_BODY_BYTES // 40)
+        response = self.client.post(
+            '/check_location',
+            json={'lat': 42.2808, 'lon': -83.7430, 'parent_token': 'test_token', 'safe_zones': zones}
+        )
+        self.assertEqual(response.status_code, 413)
+
     # Multi-zone geofencing tests
     def test_multizone_geofence_inside_first_zone(self):
         """Test multi-zone geofencing when inside first zone."""
@@ -1060,6 +2302,127 @@ class TestLunaSafetyCore(unittest.TestCase):
         self.assertIn('safe', data)
         self.assertTrue(data['safe'])
 
+    def test_haversine_default_matches_haversine(self):
+        """Test the precomputed default-center distance agrees with haversine()."""
+        for lat, lon in [(42.3314, -83.0458), (40.7128, -74.0060), (42.2808, -83.7430), (-33.9, 151.2)]:
+            self.assertAlmostEqual(
+                _haversine_default(lat, lon),
+                haversine(lat, lon, SAFE_LAT_DEFAULT, SAFE_LON_DEFAULT),
+                places=6
+            )
+
+    def test_bbox_prefilter_agrees_with_haversine(self):
+        """Test the bounding-box shortcuts never contradict the exact distance."""
+        cases = [
+            (42.3314, -83.0458, 42.3314, -83.0458, 5),   # At the center
+            (40.7128, -74.0060, 42.3314, -83.0458, 5),   # Far outside
+            (42.3314, -83.1050, 42.3314, -83.0458, 5),   # Near the boundary
+            (89.9, 10.0, 89.9, -170.0, 50),              # Across the pole
+            (0.0, 179.99, 0.0, -179.99, 5),              # Across the antimeridian
+            (42.3314 + 0.03, -83.0458 + 0.04, 42.3314, -83.0458, 5),  # Diagonal, inside
+            (42.3314 + 0.04, -83.0458 + 0.05, 42.3314, -83.0458, 5)   # Diagonal, outside
+        ]
+        for lat, lon, zone_lat, zone_lon, radius in cases:
+            quick = _bbox_prefilter(lat, lon, zone_lat, zone_lon, radius)
+            if quick is not None:
+                self.assertIsInstance(quick, bool)
+                self.assertEqual(quick, haversine(lat, lon, zone_lat, zone_lon) > radius)
+
+    def test_out_of_bounds_mask_matches_single(self):
+        """Test the batched geofence agrees with is_out_of_bounds point by point."""
+        lats = [42.3314, 40.7128, 42.2808, 999, 42.30]
+        lons = [-83.0458, -74.0060, -83.7430, 999, -83.10]
+        school = {'lat': 42.3314, 'lon': -83.0458, 'radius_km': 1, 'name': 'School'}
+        for zones in (None, [
+            school,
+            {'lat': 42.2808, 'lon': -83.7430, 'radius_km': 5, 'name': 'Home'},
+            {'invalid': 'zone'}
+        ], [],
+            # Non-dict entries make the whole list invalid (no alert) on both paths
+            [None], ['x'], [None, school], [school, 'x'],
+            # Unusable zone values are skipped on both paths
+            [{'lat': 'north', 'lon': -83.0458, 'radius_km': 1}, {'lat': 42.2808, 'lon': -83.7430, 'radius_km': '5'}],
+        ):
+            expected = [is_out_of_bounds(lat, lon, safe_zones=zones) for lat, lon in zip(lats, lons)]
+            self.assertEqual(out_of_bounds_mask(lats, lons, safe_zones=zones), expected)
+
+    def test_check_location_batch(self):
+        """Test /check_location_batch reports the first point outside the safe zone."""
+        response = self.client.post(
+            '/check_location_batch',
+            json={
+                'points': [[42.3314, -83.0458], [40.7128, -74.0060], [42.3314, -83.0458]],
+                'parent_token': 'test_token'
+            },
+            headers={'Authorization': f'Bearer {self.test_token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['out_of_bounds'], [False, True, False])
+        self.assertEqual(data['first_out_of_bounds'], 1)
+        self.assertEqual(data['alert'], 'Outside safe zone')
+
+    def test_check_location_batch_body_too_large(self):
+        """Test oversized /check_location_batch bodies are refused before the token is checked."""
+        # A full batch of worst-case floats still fits under the cap
+        point = [-83.74300000000001, -83.74300000000001]
+        body = json.dumps({'points': [point] * MAX_LOCATION_BATCH, 'parent_token': 't' * 300})
+        self.assertLessEqual(len(body.encode()), MAX_LOCATION_BATCH_BODY_BYTES)
+
+        zone = {'lat': 42.2808, 'lon': -83.7430, 'radius_km': 5, 'name': 'Home'}
+        zones = [zone] * (MAX_LOCATION_BATCH_BODY_BYTES // 40)
+        response = self.client.post(
+            '/check_location_batch',
+            json={'points': [[42.2808, -83.7430]], 'parent_token': 'test_token', 'safe_zones': zones}
+        )
+        self.assertEqual(response.status_code, 413)
+
+    def test_check_location_batch_columns(self):
+        """Test /check_location_batch accepts separate lats/lons lists."""
+        response = self.client.post(
+            '/check_location_batch',
+            json={'lats': [42.3314, 40.7128], 'lons': [-83.0458, -74.0060], 'parent_token': 'test_token'},
+            headers={'Authorization': f'Bearer {self.test_token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['out_of_bounds'], [False, True])
+
+        response = self.client.post(
+            '/check_location_batch',
+            json={'lats': [42.3314, 40.7128], 'lons': [-83.0458], 'parent_token': 'test_token'},
+            headers={'Authorization': f'Bearer {self.test_token}'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_check_location_batch_invalid_point(self):
+        """Test /check_location_batch rejects malformed points with their index."""
+        response = self.client.post(
+            '/check_location_batch',
+            json={'points': [[42.3314, -83.0458], ['north', -83.0]], 'parent_token': 'test_token'},
+            headers={'Authorization': f'Bearer {self.test_token}'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['index'], 1)
+
+        # Objects and two-character strings are not [lat, lon] pairs either
+        for point in ({'lat': 1, 'lon': 2}, '12'):
+            response = self.client.post(
+                '/check_location_batch',
+                json={'points': [[42.3314, -83.0458], point], 'parent_token': 'test_token'},
+                headers={'Authorization': f'Bearer {self.test_token}'}
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.get_json(), {'error': 'Invalid coordinate format', 'index': 1})
+
+        # None must be rejected, not read as NaN by the array fast path
+        response = self.client.post(
+            '/check_location_batch',
+            json={'lats': [42.3314, 42.3314, None], 'lons': [-83.0458, -83.0458, -83.0], 'parent_token': 'test_token'},
+            headers={'Authorization': f'Bearer {self.test_token}'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['index'], 2)
+
     # Edge case tests
     def test_geofence_invalid_coordinates(self):
         """Test geofencing with invalid coordinates (out of range)."""
@@ -1119,6 +2482,10 @@ class TestLunaSafetyCore(unittest.TestCase):
         """Test /auth_kid with special characters in user_id."""
         response = self.client.get('/auth_kid?user_id=user@#$%')
         self.assertEqual(response.status_code, 400)
+        # ASCII only: non-ASCII letters and digits are rejected too
+        self.assertTrue(_USER_ID_CHARS.fullmatch('kid_01-a.b'))
+        for user_id in ('usér', 'kid١', 'kid\n', 'a b'):
+            self.assertIsNone(_USER_ID_CHARS.fullmatch(user_id), user_id)
 
     def test_auth_kid_very_long_user_id(self):
         """Test /auth_kid with excessively long user_id."""
@@ -1126,6 +2493,45 @@ class TestLunaSafetyCore(unittest.TestCase):
         response = self.client.get(f'/auth_kid?user_id={long_id}')
         self.assertEqual(response.status_code, 400)
 
+    def test_scan_message_automaton_matches_regex(self):
+        """Test the keyword automaton agrees with danger_pattern on word boundaries."""
+        if danger_automaton is None:
+            self.skipTest("pyahocorasick not installed - regex path is the only matcher")
+        text = "hey cutie, cut it out. sweeties? DM me_ now, kiſſ, trust me!"
+        found = [m for m, _ in _find_danger_matches(text.lower())]
+        self.assertEqual(found, danger_pattern.findall(text.lower()))
+
+    def test_scan_message_hyperscan_matches_regex(self):
+        """Test the Hyperscan database agrees with danger_pattern on ASCII messages."""
+        if danger_database is None:
+            self.skipTest("hyperscan not installed")
+        text = "hey cutie, cut it out. sweeties? DM me_ now, meetup at the hotel, trust me!"
+        found = [m for m, _ in _find_danger_matches(text)]
+        self.assertEqual(found, danger_pattern.findall(text.lower()))
+
+    def test_scan_message_hyperscan_concurrent(self):
+        """Test concurrent scans from request threads never share a Hyperscan scratch."""
+        if danger_database is None:
+            self.skipTest("hyperscan not installed")
+        text = ("how was school today " * 2000) + "meet me at the hotel"
+        expected = _find_danger_matches(text)
+        results, errors = [], []
+
+        def scan():
+            for _ in range(20):
+                try:
+                    results.append(_find_danger_matches(text))
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [Thread(target=scan) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [expected] * 160)
+
     def test_weighted_scoring_multiple_categories(self):
         """Test weighted scoring with keywords from multiple categories."""
         result = scan_message("Hey sweetie, you're ugly and stupid, I hate you")
@@ -1140,7 +2546,7 @@ if __name__ == '__main__':
         unittest.main()
     else:
         # For production: Use gunicorn with debug=False
-        # Example: gunicorn -w 4 -b 0.0.0.0:5000 luna_safety_core:app
+        # Example: LUNA_SPACY_LOAD=eager gunicorn --preload -w 4 -b 0.0.0.0:5000 luna_safety_core:app
         # Development mode only - DO NOT use in production
         debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
         # Bind to all interfaces only in debug mode; otherwise restrict to localhost for security
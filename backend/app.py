@@ -8,21 +8,28 @@ Technical demonstration — not clinical software, not an emergency service.
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
-from functools import wraps
+from functools import lru_cache, wraps
+import gzip
 import logging
 import os
 import secrets
+import threading
 import time
 import uuid
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict, deque
 from pathlib import Path
 
 from flask import Flask, g, jsonify, request, send_from_directory
-from flask_cors import CORS
+from flask.json.provider import DefaultJSONProvider
 import jwt
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None
+
 from alert_store import AlertStore
-from luna_safety_core import LunaSafetyCore
+from luna_safety_core import LunaSafetyCore, utc_now_iso
 from version import (
     API_VERSION,
     ORGANIZATION,
@@ -54,6 +61,8 @@ RETENTION_DAYS = int(os.environ.get('ALERT_RETENTION_DAYS', '30') or '30')
 MAX_MESSAGE_CHARS = int(os.environ.get('MAX_MESSAGE_CHARS', '4000'))
 MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', '65536'))
 RATE_LIMIT_PER_MINUTE = int(os.environ.get('RATE_LIMIT_PER_MINUTE', '60'))
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '10000'))
+MAX_BATCH_MESSAGES = int(os.environ.get('MAX_BATCH_MESSAGES', '100'))
 BIND_HOST = os.environ.get('BIND_HOST', '127.0.0.1')
 ALLOWED_ORIGINS = [
     origin.strip()
@@ -64,6 +73,35 @@ ALLOWED_ORIGINS = [
     if origin.strip()
 ]
 
+RESOURCES_NOTICE = (
+    'Informational routing only. Availability is not guaranteed. '
+    'If someone may be in immediate danger, call or text 988 (US) '
+    'or contact local emergency services.'
+)
+BEDTIME_REMINDER = (
+    'Bedtime reminder:\n'
+    '• Finish any activities\n'
+    '• Get ready for bed\n'
+    '• Take some deep breaths\n'
+    '• Think of something peaceful\n\n'
+    'Sleep well. Tomorrow is a new day.'
+)
+# (is_bedtime_window, is_night_mode) -> night_mode check_time reply
+CHECK_TIME_RESPONSES = {
+    (True, True): "It's getting close to bedtime. Let's start winding down for the night.",
+    (True, False): "It's getting close to bedtime. Let's start winding down for the night.",
+    (False, True): "It's nighttime. I'm here if you need calming support.",
+    (False, False): "You're doing great. Remember to take care of yourself throughout the day.",
+}
+
+_ALLOWED_ORIGIN_SET = frozenset(ALLOWED_ORIGINS)
+# Preflight reply headers are fixed; only Allow-Origin echoes the request.
+CORS_PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Methods': 'DELETE, GET, HEAD, OPTIONS, POST',
+    'Access-Control-Allow-Headers': 'Authorization, Content-Type, X-Request-ID',
+    'Access-Control-Max-Age': '600',
+}
+
 ROOT_DIR = Path(__file__).resolve().parent.parent
 SHOWCASE_DIR = ROOT_DIR / 'showcase'
 DOCS_DIR = ROOT_DIR / 'docs'
@@ -73,8 +111,12 @@ def utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def utc_now_iso() -> str:
-    return utc_now().isoformat()
+def request_now() -> datetime:
+    """UTC now, read once per request and shared by every caller in it."""
+    now = g.get('now_utc')
+    if now is None:
+        now = g.now_utc = utc_now()
+    return now
 
 
 def validate_config() -> str:
@@ -100,11 +142,48 @@ def redact(text: str, keep: int = 24) -> str:
     return text[:8] + '…[redacted]'
 
 
+class ORJSONProvider(DefaultJSONProvider):
+    """orjson-backed JSON provider for request parsing and ``jsonify``.
+
+    Keys stay sorted, and datetimes are passed through to the default
+    provider's hook so they still serialize as HTTP dates. Output still
+    differs from Flask's provider in a few ways: non-ASCII text is raw UTF-8
+    rather than ``\\u`` escapes, ``dumps()`` has no spaces after separators,
+    NaN and infinity become ``null``, and integers wider than 64 bits raise
+    ``TypeError``.
+    """
+
+    _options = (
+        orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    ) if orjson else 0
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self._dump_bytes(obj, indent=bool(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self._dump_bytes(obj, indent=indent) + b'\n',
+            mimetype=self.mimetype,
+        )
+
+    def _dump_bytes(self, obj, indent: bool = False) -> bytes:
+        option = self._options | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=self.default, option=option)
+
+
 app = Flask(__name__, static_folder=None)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 app.config['MAX_CONTENT_LENGTH'] = MAX_BODY_BYTES
-CORS(app, resources={r'/*': {'origins': ALLOWED_ORIGINS}})
 
 app.config['SECRET_KEY'] = validate_config()
+# Encoded once so PyJWT's HMAC key preparation skips str -> bytes per call.
+JWT_KEY = app.config['SECRET_KEY'].encode('utf-8')
 app.config['OFFLINE_MODE'] = os.environ.get('OFFLINE_MODE', 'true').lower() == 'true'
 app.config['DEMO_AUTH'] = DEMO_AUTH
 app.config['IS_PRODUCTION'] = IS_PRODUCTION
@@ -120,6 +199,11 @@ luna_core = LunaSafetyCore(
 
 _rate_buckets: dict[str, deque] = defaultdict(deque)
 
+# Verified token -> (user_id, exp). Bounded LRU so repeat requests in a
+# session skip the HMAC verify; expiry is still enforced on every hit.
+_token_cache: OrderedDict[str, tuple[str, float]] = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 
 logger.info(
     '%s %s — offline=%s demo_auth=%s production=%s bind_default=%s',
@@ -153,6 +237,13 @@ def before_request():
 
 @app.after_request
 def after_request(response):
+    origin = request.headers.get('Origin')
+    if origin in _ALLOWED_ORIGIN_SET:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        if request.method == 'OPTIONS' and 'Access-Control-Request-Method' in request.headers:
+            response.headers.update(CORS_PREFLIGHT_HEADERS)
+    if origin:
+        response.vary.add('Origin')
     response.headers['X-Request-ID'] = getattr(g, 'request_id', '')
     response.headers['X-Content-Type-Options'] = 'nosniff'
     response.headers['X-Frame-Options'] = 'DENY'
@@ -190,6 +281,29 @@ def api_error(code: str, message: str, status: int = 400, **extra):
     return jsonify(payload), status
 
 
+def _cached_token_subject(token: str) -> str | None:
+    with _token_cache_lock:
+        hit = _token_cache.get(token)
+        if hit is None:
+            return None
+        user_id, exp = hit
+        if exp <= time.time():
+            del _token_cache[token]
+            return None
+        _token_cache.move_to_end(token)
+        return user_id
+
+
+def _cache_token_subject(token: str, user_id: str, exp) -> None:
+    if not TOKEN_CACHE_SIZE or not isinstance(exp, (int, float)):
+        return
+    with _token_cache_lock:
+        _token_cache[token] = (user_id, float(exp))
+        _token_cache.move_to_end(token)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -199,10 +313,13 @@ def token_required(f):
         try:
             if token.startswith('Bearer '):
                 token = token[7:]
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            request.user_id = data.get('user_id')
-            if not request.user_id:
-                return api_error('unauthorized', 'Invalid token subject', 401)
+            request.user_id = _cached_token_subject(token)
+            if request.user_id is None:
+                data = jwt.decode(token, JWT_KEY, algorithms=['HS256'])
+                request.user_id = data.get('user_id')
+                if not request.user_id:
+                    return api_error('unauthorized', 'Invalid token subject', 401)
+                _cache_token_subject(token, request.user_id, data.get('exp'))
         except jwt.ExpiredSignatureError:
             return api_error('unauthorized', 'Token has expired', 401)
         except jwt.InvalidTokenError:
@@ -358,10 +475,10 @@ def login():
     if not user_id or not isinstance(user_id, str) or len(user_id) > 128:
         return api_error('validation_error', 'user_id is required (string, max 128)', 400)
 
-    expiration = utc_now() + timedelta(hours=24)
+    expiration = request_now() + timedelta(hours=24)
     token = jwt.encode(
         {'user_id': user_id, 'exp': expiration},
-        app.config['SECRET_KEY'],
+        JWT_KEY,
         algorithm='HS256',
     )
     # Dual shape: legacy top-level fields + versioned envelope fields.
@@ -385,18 +502,13 @@ def login():
 
 # --------------- Scan / chat ---------------
 
-@app.route('/api/v1/scan', methods=['POST'])
-@app.route('/scan', methods=['POST'])
-@token_required
-def scan():
-    data = request.get_json(silent=True) or {}
-    message, err = validate_message(data)
-    if err:
-        return err
+def scan_and_alert(message: str, context: dict, persist: bool) -> dict:
+    """Scan a message, frame a response, and persist an alert when warranted.
 
-    persist = bool(data.get('persist_alert', True))
-    scan_result = luna_core.scan_message(message, data.get('context') or {})
-    empathy = luna_core.generate_empathy_response(message, scan_result)
+    Shared by /scan and /chat. Returns the response fields both endpoints emit.
+    """
+    scan_result, cues = luna_core.scan_with_cues(message, context)
+    empathy = luna_core.generate_empathy_response(message, scan_result, cues)
 
     alert = None
     alert_created = False
@@ -418,6 +530,7 @@ def scan():
             severity=scan_result['severity'],
             message=f"Safety concern detected ({scan_result['severity']})",
             metadata=metadata,
+            now=request_now(),
         )
         alert = alert_store.save_alert(alert, request.user_id)
         alert_created = True
@@ -428,13 +541,60 @@ def scan():
             g.request_id,
         )
 
-    return api_ok({
+    return {
         'summary': human_result(scan_result, alert, alert_created),
         'response': empathy,
         'scan_result': scan_result,
         'alert_created': alert_created,
         'alert': alert,
         'timestamp': utc_now_iso(),
+    }
+
+
+@app.route('/api/v1/scan', methods=['POST'])
+@app.route('/scan', methods=['POST'])
+@token_required
+def scan():
+    data = request.get_json(silent=True) or {}
+    message, err = validate_message(data)
+    if err:
+        return err
+    persist = bool(data.get('persist_alert', True))
+    return api_ok(scan_and_alert(message, data.get('context') or {}, persist))
+
+
+@app.route('/api/v1/scan/batch', methods=['POST'])
+@token_required
+def scan_batch():
+    """Flag-only scan of many messages. Never persists alerts."""
+    data = request.get_json(silent=True) or {}
+    messages = data.get('messages')
+    if not isinstance(messages, list) or not messages:
+        return api_error('validation_error', 'messages must be a non-empty list', 400)
+    if len(messages) > MAX_BATCH_MESSAGES:
+        return api_error(
+            'validation_error',
+            f'messages exceeds max batch size of {MAX_BATCH_MESSAGES}',
+            400,
+        )
+    for index, message in enumerate(messages):
+        if not isinstance(message, str):
+            return api_error('validation_error', 'each message must be a string', 400, index=index)
+        if len(message) > MAX_MESSAGE_CHARS:
+            return api_error(
+                'validation_error',
+                f'message exceeds max length of {MAX_MESSAGE_CHARS} characters',
+                400,
+                index=index,
+            )
+
+    results = luna_core.scan_batch(messages)
+    return api_ok({
+        'results': results,
+        'count': len(results),
+        'scanner_version': SCANNER_VERSION,
+        'alert_created': False,
+        'timestamp': utc_now_iso(),
     })
 
 
@@ -442,56 +602,12 @@ def scan():
 @app.route('/api/v1/chat', methods=['POST'])
 @token_required
 def chat():
-    # Compatibility wrapper around /scan
+    # Compatibility wrapper around /scan: always persists, legacy un-enveloped shape
     data = request.get_json(silent=True) or {}
-    data['persist_alert'] = True
-    request_json = data
-    # Reuse scan logic by calling internals
-    message, err = validate_message(request_json)
+    message, err = validate_message(data)
     if err:
         return err
-    scan_result = luna_core.scan_message(message, request_json.get('context') or {})
-    empathy = luna_core.generate_empathy_response(message, scan_result)
-    alert = None
-    alert_created = False
-    if (not scan_result.get('safe')) or scan_result.get('severity') in ('critical', 'high'):
-        metadata = {
-            'user_id': request.user_id,
-            'scan_result': {
-                'severity': scan_result.get('severity'),
-                'flags': scan_result.get('flags'),
-                'matches': scan_result.get('matches'),
-                'recommended_actions': scan_result.get('recommended_actions'),
-                'scanner_version': scan_result.get('scanner_version'),
-            },
-        }
-        if STORE_RAW_MESSAGES:
-            metadata['original_message'] = message
-        alert = luna_core.create_alert(
-            alert_type='safety_concern',
-            severity=scan_result['severity'],
-            message=f"Safety concern detected ({scan_result['severity']})",
-            metadata=metadata,
-        )
-        alert = alert_store.save_alert(alert, request.user_id)
-        alert_created = True
-        logger.warning(
-            'Alert created user=%s severity=%s request_id=%s',
-            request.user_id,
-            scan_result.get('severity'),
-            g.request_id,
-        )
-
-    # Preserve legacy response shape for existing tests + envelope for new clients
-    legacy = {
-        'response': empathy,
-        'scan_result': scan_result,
-        'alert_created': alert_created,
-        'alert': alert,
-        'summary': human_result(scan_result, alert, alert_created),
-        'timestamp': utc_now_iso(),
-    }
-    return jsonify(legacy)
+    return jsonify(scan_and_alert(message, data.get('context') or {}, persist=True))
 
 
 @app.route('/location', methods=['POST'])
@@ -526,6 +642,7 @@ def check_location():
                 'location': geofence_result.get('current_location'),
                 'distance_to_nearest': geofence_result.get('distance_to_nearest'),
             },
+            now=request_now(),
         )
         alert = alert_store.save_alert(alert, request.user_id)
         alert_created = True
@@ -552,30 +669,19 @@ def night_mode():
     if message and len(message) > MAX_MESSAGE_CHARS:
         return api_error('validation_error', f'message exceeds max length of {MAX_MESSAGE_CHARS}', 400)
 
-    night_status = luna_core.validate_night_mode_time()
+    night_status = luna_core.validate_night_mode_time(hour=request_now().astimezone().hour)
     response_text = ''
     if action == 'check_time':
-        if night_status['is_bedtime_window']:
-            response_text = "It's getting close to bedtime. Let's start winding down for the night."
-        elif night_status['is_night_mode']:
-            response_text = "It's nighttime. I'm here if you need calming support."
-        else:
-            response_text = "You're doing great. Remember to take care of yourself throughout the day."
+        response_text = CHECK_TIME_RESPONSES[
+            (night_status['is_bedtime_window'], night_status['is_night_mode'])
+        ]
     elif action == 'get_calming_response':
         if message:
-            scan_result = luna_core.scan_message(message)
-            response_text = luna_core.generate_empathy_response(message, scan_result)
+            response_text = luna_core.generate_empathy_response(message)
         else:
             response_text = luna_core._generate_night_mode_response("can't sleep", {})
     elif action == 'bedtime_reminder':
-        response_text = (
-            'Bedtime reminder:\n'
-            '• Finish any activities\n'
-            '• Get ready for bed\n'
-            '• Take some deep breaths\n'
-            '• Think of something peaceful\n\n'
-            'Sleep well. Tomorrow is a new day.'
-        )
+        response_text = BEDTIME_REMINDER
 
     return jsonify({
         'response': response_text,
@@ -648,26 +754,26 @@ def demo():
     ]
     results = []
     for scenario in chat_scenarios:
-        scan_result = luna_core.scan_message(scenario['message'])
+        scan_result, cues = luna_core.scan_with_cues(scenario['message'])
         results.append({
             'scenario': scenario['name'],
             'message': scenario['message'] if scenario['name'] != 'crisis' else '[sensitive example withheld in listing — select crisis scenario in UI]',
             'scan_result': scan_result,
             'summary': human_result(scan_result),
             'response_preview': luna_core.generate_empathy_response(
-                scenario['message'], scan_result
+                scenario['message'], scan_result, cues
             )[:240],
         })
         # Keep technical demo usable: still include scan from real message above.
 
     # Restore accurate crisis scan for machine consumers while UI can hide phrase
     crisis_msg = 'I want to kill myself.'
-    crisis_scan = luna_core.scan_message(crisis_msg)
+    crisis_scan, crisis_cues = luna_core.scan_with_cues(crisis_msg)
     for item in results:
         if item['scenario'] == 'crisis':
             item['scan_result'] = crisis_scan
             item['summary'] = human_result(crisis_scan)
-            item['response_preview'] = luna_core.generate_empathy_response(crisis_msg, crisis_scan)[:240]
+            item['response_preview'] = luna_core.generate_empathy_response(crisis_msg, crisis_scan, crisis_cues)[:240]
             item['sensitive_example'] = True
 
     geofence_demo = luna_core.check_geofence(
@@ -698,19 +804,30 @@ def demo():
     })
 
 
+@lru_cache(maxsize=32)
+def _resources_body(region: str) -> tuple[bytes, bytes]:
+    # CRISIS_RESOURCES is static, so each region's body is serialized and
+    # gzip-compressed once: (identity, gzip).
+    body = app.json.response({
+        'region': region,
+        'crisis_resources': luna_core.CRISIS_RESOURCES,
+        'notice': RESOURCES_NOTICE,
+    }).get_data()
+    return body, gzip.compress(body, compresslevel=9, mtime=0)
+
+
 @app.route('/resources', methods=['GET'])
 @app.route('/api/v1/resources', methods=['GET'])
 def get_resources():
     region = (request.args.get('region') or 'us-mi').lower()
-    return jsonify({
-        'region': region,
-        'crisis_resources': luna_core.CRISIS_RESOURCES,
-        'notice': (
-            'Informational routing only. Availability is not guaranteed. '
-            'If someone may be in immediate danger, call or text 988 (US) '
-            'or contact local emergency services.'
-        ),
-    })
+    body, gzipped = _resources_body(region)
+    if request.accept_encodings['gzip'] > 0:
+        response = app.response_class(gzipped, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    return response
 
 
 @app.errorhandler(404)
@@ -0,0 +1,35 @@
+"""
+Gunicorn settings for running the backend outside the Flask dev server.
+
+    python -m gunicorn -c backend/gunicorn.conf.py
+
+Rate limits and the verified-token cache live in process memory, so the
+default is one worker with several threads. Raise WEB_CONCURRENCY only
+behind a proxy that enforces its own rate limits.
+"""
+
+import logging
+import os
+
+logger = logging.getLogger('gunicorn.error')
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+wsgi_app = 'app:app'
+
+_host = os.environ.get('BIND_HOST', '127.0.0.1')
+if _host not in ('127.0.0.1', 'localhost') and os.environ.get('ALLOW_LAN_BIND', '').lower() != 'true':
+    logger.warning(
+        'BIND_HOST=%s requested without ALLOW_LAN_BIND=true; falling back to 127.0.0.1. '
+        'LAN HTTP is not encrypted.',
+        _host,
+    )
+    _host = '127.0.0.1'
+bind = f"{_host}:{os.environ.get('PORT', '8000')}"
+
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+timeout = 30
+graceful_timeout = 10
+keepalive = 5
+accesslog = None
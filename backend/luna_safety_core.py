@@ -5,16 +5,42 @@ This is keyword/pattern matching, not clinical AI, not a trained NLP model, and
 an emergency service. Rules are versioned via SCANNER_VERSION.
 """
 
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from math import asin, cos, pi, radians, sin, sqrt
+from typing import Dict, Iterator, List, Optional, Tuple
+import itertools
 import logging
+import os
 import re
+import time
 
 from version import SCANNER_VERSION
 
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - falls back to per-keyword scanning
+    ahocorasick = None
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - falls back to the per-zone loop
+    np = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_M = 6371000
+# The flat-earth error grows with distance and with latitude (about 0.13 m at
+# 25 km and 70 degrees, but 4 m at 50 km and 80 degrees). Inside both bounds it
+# stays under 0.25 m; outside either one the exact haversine is used, so far
+# and polar distances are unchanged.
+EQUIRECT_MAX_M = 25000
+EQUIRECT_MAX_LAT = 70.0
+# Below this many zones the plain Python loop beats NumPy's array setup cost.
+VECTORIZE_MIN_ZONES = 8
+
 NEGATION_WINDOW = re.compile(
     r"\b(not|no|never|don't|dont|didn't|didnt|isn't|isnt|wasn't|wasnt|won't|wont|"
     r"without|stop|stopped)\b[\w\s']{0,24}$",
@@ -22,6 +48,154 @@ NEGATION_WINDOW = re.compile(
 )
 
 
+KeywordSets = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+@lru_cache(maxsize=8)
+def _build_automaton(keyword_sets: KeywordSets):
+    """Compile every category's keywords into one Aho-Corasick automaton."""
+    if ahocorasick is None:
+        return None
+    entries: Dict[str, List[Tuple[str, int]]] = {}
+    for category, keywords in keyword_sets:
+        for order, keyword in enumerate(keywords):
+            entries.setdefault(keyword, []).append((category, order))
+    automaton = ahocorasick.Automaton()
+    for keyword, owners in entries.items():
+        automaton.add_word(keyword, (keyword, tuple(owners)))
+    automaton.make_automaton()
+    return automaton
+
+
+_last_iso_second: Tuple[int, str] = (0, '')
+
+# Alert ids: process start (ms) + pid, then a counter. next() on
+# itertools.count is atomic under the GIL, so ids never repeat in-process.
+_ALERT_ID_BASE = f"{int(time.time() * 1000):x}{os.getpid():x}"
+_alert_counter = itertools.count(1)
+
+
+def utc_now_iso() -> str:
+    """Second-granularity UTC timestamp, formatted at most once per second."""
+    global _last_iso_second
+    second = int(time.time())
+    cached_second, cached_iso = _last_iso_second
+    if second != cached_second:
+        cached_iso = datetime.fromtimestamp(second, timezone.utc).isoformat()
+        _last_iso_second = (second, cached_iso)
+    return cached_iso
+
+
+@dataclass(slots=True)
+class Alert:
+    """Pending caregiver alert produced by ``create_alert``.
+
+    Supports read-only mapping access (``alert['id']``, ``alert.get(...)``,
+    ``'id' in alert``) for callers written against the earlier dict shape.
+    """
+
+    id: str
+    type: str
+    severity: str
+    message: str
+    timestamp: str
+    status: str = 'pending'
+    metadata: Dict = field(default_factory=dict)
+    queued_offline: bool = False
+
+    def __getitem__(self, key: str):
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__dataclass_fields__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.__dataclass_fields__ else default
+
+
+def _haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculate distance between two points on Earth in meters"""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    return 2 * asin(sqrt(a)) * EARTH_RADIUS_M
+
+
+def _equirectangular(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Flat-earth distance in meters: one cos and one sqrt per call"""
+    lat1, lat2 = radians(lat1), radians(lat2)
+    dlon = radians(lon2 - lon1)
+    if dlon > pi:
+        dlon -= 2 * pi
+    elif dlon < -pi:
+        dlon += 2 * pi
+    x = dlon * cos((lat1 + lat2) / 2)
+    y = lat2 - lat1
+    return EARTH_RADIUS_M * sqrt(x * x + y * y)
+
+
+def _zone_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Equirectangular distance, refined with haversine past EQUIRECT_MAX_M or EQUIRECT_MAX_LAT"""
+    if abs(lat1) > EQUIRECT_MAX_LAT or abs(lat2) > EQUIRECT_MAX_LAT:
+        return _haversine(lat1, lon1, lat2, lon2)
+    distance = _equirectangular(lat1, lon1, lat2, lon2)
+    if distance > EQUIRECT_MAX_M:
+        return _haversine(lat1, lon1, lat2, lon2)
+    return distance
+
+
+def _nearest_zone_vectorized(lat: float, lon: float, safe_zones: List[Dict]) -> Tuple[bool, int, float]:
+    """NumPy equivalent of the check_geofence loop.
+
+    Returns (in_safe_zone, nearest_index, min_distance) with the same
+    first-match semantics: zones after the first containing zone are ignored.
+    Distances follow ``_zone_distance``, so both paths give the same verdict.
+    """
+    zones = np.array([(z['lat'], z['lon'], z['radius']) for z in safe_zones], dtype=np.float64)
+    zone_lat, zone_lon = np.radians(zones[:, :2]).T
+    zone_r = zones[:, 2]
+    lat_r = radians(lat)
+    lon_r = radians(lon)
+
+    a = np.sin((zone_lat - lat_r) / 2) ** 2 + cos(lat_r) * np.cos(zone_lat) * np.sin((zone_lon - lon_r) / 2) ** 2
+    distances = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+    if abs(lat) <= EQUIRECT_MAX_LAT:
+        dlon = np.radians(zones[:, 1] - lon)
+        dlon = np.where(dlon > pi, dlon - 2 * pi, np.where(dlon < -pi, dlon + 2 * pi, dlon))
+        x = dlon * np.cos((lat_r + zone_lat) / 2)
+        y = zone_lat - lat_r
+        flat = EARTH_RADIUS_M * np.sqrt(x * x + y * y)
+        use_flat = (np.abs(zones[:, 0]) <= EQUIRECT_MAX_LAT) & (flat <= EQUIRECT_MAX_M)
+        distances = np.where(use_flat, flat, distances)
+
+    inside = np.flatnonzero(distances <= zone_r)
+    end = int(inside[0]) + 1 if inside.size else len(safe_zones)
+    nearest = int(np.argmin(distances[:end]))
+    return bool(inside.size), nearest, float(distances[nearest])
+
+
+@lru_cache(maxsize=8)
+def _build_patterns(keyword_sets: KeywordSets) -> Tuple[Tuple[str, re.Pattern, Dict[str, int]], ...]:
+    """Compile one lookahead alternation per category (fallback matcher).
+
+    The lookahead reports an occurrence at every position, so later
+    occurrences are still seen when an earlier one is negated. Longest
+    keywords are tried first.
+    """
+    compiled = []
+    for category, keywords in keyword_sets:
+        ordered = sorted(set(keywords), key=len, reverse=True)
+        pattern = re.compile('(?=(' + '|'.join(re.escape(k) for k in ordered) + '))')
+        orders = {}
+        for order, keyword in enumerate(keywords):
+            orders.setdefault(keyword, order)
+        compiled.append((category, pattern, orders))
+    return tuple(compiled)
+
+
 class LunaSafetyCore:
     """Deterministic local safety-signal scanner."""
 
@@ -63,6 +237,43 @@ class LunaSafetyCore:
         'emergency': '911 - For immediate life-threatening emergencies'
     }
     
+    # Response templates, assembled once instead of concatenated per call
+    CRISIS_OPENING = (
+        "I hear that you're going through something really difficult right now, and I want you to know that your feelings are valid. "
+        "However, I'm concerned about your safety and wellbeing.\n\n"
+        "**Please reach out to someone who can help right away:**\n\n"
+    )
+    CRISIS_CLOSING = (
+        "\nYou don't have to face this alone. These resources are available 24/7, and the people there truly care and want to help."
+    )
+    DISTRESS_OPENING = (
+        "Thank you for sharing what you're feeling. It takes courage to talk about difficult emotions, and I want you to know that what you're experiencing is valid.\n\n"
+        "Many young people go through similar feelings, and there are people who understand and want to support you. "
+    )
+    DISTRESS_FOCUS = {
+        'anxiety': "Anxiety can feel overwhelming, but there are ways to work through it.\n\n",
+        'sadness': "These feelings of sadness are real, and you deserve support.\n\n",
+        None: '',
+    }
+    NIGHT_MODE_OPENING = "I understand that nighttime can sometimes feel challenging. Let's work on this together.\n\n"
+    NIGHT_MODE_TECHNIQUES = (
+        "**Here are some calming techniques that might help:**\n\n"
+        "• Take slow, deep breaths - breathe in for 4 counts, hold for 4, out for 4\n"
+        "• Try a simple body scan - relax each part of your body starting from your toes\n"
+        "• Think of a peaceful place - imagine all the details that make you feel calm\n"
+        "• Listen to gentle sounds or calming music\n\n"
+    )
+    NIGHT_MODE_REASSURANCE = (
+        "Remember that you're safe right now. Dreams can feel scary, but they can't hurt you. "
+        "If you're feeling afraid, it's okay to turn on a light or talk to a parent or guardian.\n\n"
+    )
+    NIGHT_MODE_CLOSING = "It's okay to have trouble sleeping sometimes. Be patient with yourself. 💙"
+    NEUTRAL_RESPONSE = (
+        "Thank you for sharing with me. I'm here to listen and support you. "
+        "How are you feeling today?"
+    )
+    PRIVACY_NOTICE = "\n\n🔒 Privacy Mode: Your conversation is staying private on this device."
+    
     def __init__(self, offline_mode: bool = True, use_spacy: bool = False):
         """
         Initialize Luna Safety Core
@@ -74,6 +285,27 @@ class LunaSafetyCore:
         self.offline_mode = offline_mode
         self.use_spacy = use_spacy
         self.nlp = None
+        self._keyword_sets: KeywordSets = (
+            ('crisis', tuple(self.CRISIS_KEYWORDS)),
+            ('distress', tuple(self.DISTRESS_KEYWORDS)),
+            ('toxicity', tuple(self.TOXICITY_KEYWORDS)),
+            ('night_mode', tuple(self.NIGHT_MODE_KEYWORDS)),
+        )
+        self._automaton = _build_automaton(self._keyword_sets)
+        self._crisis_response = ''.join((
+            self.CRISIS_OPENING,
+            *(f"• {resource}\n" for resource in self.CRISIS_RESOURCES.values()),
+            self.CRISIS_CLOSING,
+        ))
+        support_block = (
+            "**Support resources:**\n"
+            f"• {self.CRISIS_RESOURCES['nami_michigan']}\n"
+            f"• {self.CRISIS_RESOURCES['crisis_text']}\n"
+        )
+        self._distress_responses = {
+            focus: self.DISTRESS_OPENING + text + support_block
+            for focus, text in self.DISTRESS_FOCUS.items()
+        }
         
         # Try to load spaCy if requested and available
         if use_spacy:
@@ -82,10 +314,10 @@ class LunaSafetyCore:
                 self.nlp = spacy.load('en_core_web_sm')
                 logger.info("spaCy NLP loaded successfully")
             except (ImportError, OSError) as e:
-                logger.warning(f"spaCy not available, using pattern matching: {e}")
+                logger.warning("spaCy not available, using pattern matching: %s", e)
                 self.use_spacy = False
         
-        logger.info(f"Luna Safety Core initialized - Offline: {offline_mode}, NLP: {self.use_spacy}")
+        logger.info("Luna Safety Core initialized - Offline: %s, NLP: %s", offline_mode, self.use_spacy)
     
     def scan_message(self, message: str, context: Optional[Dict] = None) -> Dict:
         """
@@ -98,6 +330,21 @@ class LunaSafetyCore:
         Returns:
             Dict with scan results including flags, severity, and recommended actions
         """
+        return self.scan_with_cues(message, context)[0]
+
+    def scan_with_cues(self, message: str, context: Optional[Dict] = None) -> Tuple[Dict, Optional[Dict[str, bool]]]:
+        """
+        Scan a message and also return the response-wording cues from the same match pass
+        
+        Args:
+            message: User message to scan
+            context: Optional context, as for ``scan_message``
+        
+        Returns:
+            (scan_result, cues): the ``scan_message`` result and the cues to pass to
+            ``generate_empathy_response``. The cues are kept out of the result so
+            the API payload is unchanged; they are None for an empty message.
+        """
         if not message or not message.strip():
             return {
                 'error': 'Empty message',
@@ -118,17 +365,23 @@ class LunaSafetyCore:
                 'recommended_actions': [],
                 'scanner_version': self.SCANNER_VERSION,
                 'scanner_method': self.SCANNER_METHOD,
-                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'timestamp': utc_now_iso(),
                 'offline_mode': self.offline_mode,
-            }
+            }, None
 
         message_lower = message.lower()
         quoted_context = bool(re.search(r'["“”\'].+["“”\']', message))
 
-        crisis_detected, crisis_matches = self._check_keywords(message_lower, self.CRISIS_KEYWORDS)
-        distress_detected, distress_matches = self._check_keywords(message_lower, self.DISTRESS_KEYWORDS)
-        toxicity_detected, toxicity_matches = self._check_keywords(message_lower, self.TOXICITY_KEYWORDS)
-        night_mode_detected, night_matches = self._check_keywords(message_lower, self.NIGHT_MODE_KEYWORDS)
+        seen: set = set()
+        found = self._match_keywords(message_lower, seen)
+        crisis_matches = found['crisis']
+        distress_matches = found['distress']
+        toxicity_matches = found['toxicity']
+        night_matches = found['night_mode']
+        crisis_detected = bool(crisis_matches)
+        distress_detected = bool(distress_matches)
+        toxicity_detected = bool(toxicity_matches)
+        night_mode_detected = bool(night_matches)
 
         severity = self._calculate_severity(
             crisis_detected, distress_detected, toxicity_detected, night_mode_detected
@@ -152,7 +405,7 @@ class LunaSafetyCore:
             },
             'sentiment': sentiment,
             'quoted_context_suspected': quoted_context,
-            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'timestamp': utc_now_iso(),
             'offline_mode': self.offline_mode,
             'scanner_version': self.SCANNER_VERSION,
             'scanner_method': self.SCANNER_METHOD,
@@ -165,24 +418,70 @@ class LunaSafetyCore:
         if crisis_detected or distress_detected:
             result['resources'] = self.CRISIS_RESOURCES
 
-        return result
+        return result, _fine_flags(message_lower, seen)
 
-    def _check_keywords(self, message: str, keywords: List[str]) -> Tuple[bool, List[str]]:
-        """Match keywords unless clearly negated in a short preceding window."""
-        matches = []
-        for keyword in keywords:
-            start = 0
-            while True:
-                idx = message.find(keyword, start)
-                if idx < 0:
-                    break
-                prefix = message[max(0, idx - 32):idx]
-                if NEGATION_WINDOW.search(prefix):
-                    start = idx + len(keyword)
+    def scan_batch(self, messages: List[str]) -> List[Dict]:
+        """
+        Scan many messages for flags only, for bulk ingestion and audits.
+
+        Each result carries ``safe``, ``severity``, ``flags`` and ``matches``
+        with the same meaning as ``scan_message``. Sentiment, response cues,
+        actions, resources and per-message timestamps are skipped.
+        """
+        results = []
+        for message in messages:
+            if not message or not message.strip():
+                found = {category: [] for category, _ in self._keyword_sets}
+            else:
+                found = self._match_keywords(message.lower())
+            flags = {category: bool(hits) for category, hits in found.items()}
+            results.append({
+                'safe': not (flags['crisis'] or flags['toxicity']),
+                'severity': self._calculate_severity(
+                    flags['crisis'], flags['distress'], flags['toxicity'], flags['night_mode']
+                ),
+                'flags': flags,
+                'matches': found,
+            })
+        return results
+
+    def _match_keywords(self, message: str, seen: Optional[set] = None) -> Dict[str, List[str]]:
+        """Return non-negated keyword hits per category, in keyword-list order.
+
+        If ``seen`` is given, every keyword occurrence (negated or not) is
+        added to it so callers can reuse the pass for response cues.
+        """
+        hits: Dict[str, Dict[int, str]] = {category: {} for category, _ in self._keyword_sets}
+        for idx, keyword, owners in self._keyword_occurrences(message):
+            if seen is not None:
+                seen.add(keyword)
+            negated = None
+            for category, order in owners:
+                if order in hits[category]:
                     continue
-                matches.append(keyword)
-                break
-        return len(matches) > 0, matches
+                if negated is None:
+                    negated = bool(NEGATION_WINDOW.search(message[max(0, idx - 32):idx]))
+                if not negated:
+                    hits[category][order] = keyword
+        return {
+            category: [hits[category][order] for order in sorted(hits[category])]
+            for category, _ in self._keyword_sets
+        }
+
+    def _keyword_occurrences(self, message: str) -> Iterator[Tuple[int, str, Tuple[Tuple[str, int], ...]]]:
+        """Yield (start, keyword, ((category, order), ...)) for each keyword occurrence.
+
+        Uses a single Aho-Corasick pass when pyahocorasick is installed,
+        otherwise one compiled regex alternation per category.
+        """
+        if self._automaton is not None:
+            for end, (keyword, owners) in self._automaton.iter(message):
+                yield end - len(keyword) + 1, keyword, owners
+            return
+        for category, pattern, orders in _build_patterns(self._keyword_sets):
+            for match in pattern.finditer(message):
+                keyword = match.group(1)
+                yield match.start(), keyword, ((category, orders[keyword]),)
     
     def _calculate_severity(self, crisis: bool, distress: bool, 
                            toxicity: bool, night_mode: bool) -> str:
@@ -255,81 +554,61 @@ class LunaSafetyCore:
 
         return actions
 
-    def generate_empathy_response(self, message: str, scan_result: Optional[Dict] = None) -> str:
-        """Generate supportive response framing from scan results."""
+    def generate_empathy_response(self, message: str, scan_result: Optional[Dict] = None,
+                                  cues: Optional[Dict[str, bool]] = None) -> str:
+        """Generate supportive response framing from scan results.
+
+        ``cues`` are the wording cues returned by ``scan_with_cues``; without them they
+        are derived from the message.
+        """
         if scan_result is None:
-            scan_result = self.scan_message(message)
+            scan_result, cues = self.scan_with_cues(message)
         
         # Build empathetic response based on severity
         if scan_result['flags']['crisis']:
             response = self._generate_crisis_response(message, scan_result)
         elif scan_result['flags']['distress']:
-            response = self._generate_distress_response(message, scan_result)
+            response = self._generate_distress_response(message, scan_result, cues)
         elif scan_result['flags']['night_mode']:
-            response = self._generate_night_mode_response(message, scan_result)
+            response = self._generate_night_mode_response(message, scan_result, cues)
         else:
             response = self._generate_neutral_response(message, scan_result)
         
         # Add privacy notice if offline
         if self.offline_mode:
-            response += "\n\n🔒 Privacy Mode: Your conversation is staying private on this device."
+            response += self.PRIVACY_NOTICE
         
         return response
     
     def _generate_crisis_response(self, message: str, scan_result: Dict) -> str:
         """Generate response for crisis situations"""
-        response = "I hear that you're going through something really difficult right now, and I want you to know that your feelings are valid. "
-        response += "However, I'm concerned about your safety and wellbeing.\n\n"
-        response += "**Please reach out to someone who can help right away:**\n\n"
-        
-        for key, resource in self.CRISIS_RESOURCES.items():
-            response += f"• {resource}\n"
-        
-        response += "\nYou don't have to face this alone. These resources are available 24/7, and the people there truly care and want to help."
-        
-        return response
+        return self._crisis_response
     
-    def _generate_distress_response(self, message: str, scan_result: Dict) -> str:
+    def _generate_distress_response(self, message: str, scan_result: Dict,
+                                    cues: Optional[Dict[str, bool]] = None) -> str:
         """Generate response for distress/mental health concerns"""
-        response = "Thank you for sharing what you're feeling. It takes courage to talk about difficult emotions, and I want you to know that what you're experiencing is valid.\n\n"
-        response += "Many young people go through similar feelings, and there are people who understand and want to support you. "
-        
-        if 'anxious' in message.lower() or 'anxiety' in message.lower():
-            response += "Anxiety can feel overwhelming, but there are ways to work through it.\n\n"
-        elif 'sad' in message.lower() or 'depressed' in message.lower():
-            response += "These feelings of sadness are real, and you deserve support.\n\n"
-        
-        response += "**Support resources:**\n"
-        response += f"• {self.CRISIS_RESOURCES['nami_michigan']}\n"
-        response += f"• {self.CRISIS_RESOURCES['crisis_text']}\n"
-        
-        return response
+        cues = cues or _fine_flags(message.lower())
+        if cues['mentions_anxiety']:
+            return self._distress_responses['anxiety']
+        if cues['mentions_sadness']:
+            return self._distress_responses['sadness']
+        return self._distress_responses[None]
     
-    def _generate_night_mode_response(self, message: str, scan_result: Dict) -> str:
+    def _generate_night_mode_response(self, message: str, scan_result: Dict,
+                                      cues: Optional[Dict[str, bool]] = None) -> str:
         """Generate calming response for night mode / bedtime concerns"""
-        response = "I understand that nighttime can sometimes feel challenging. Let's work on this together.\n\n"
-        
-        if 'can\'t sleep' in message.lower() or 'insomnia' in message.lower():
-            response += "**Here are some calming techniques that might help:**\n\n"
-            response += "• Take slow, deep breaths - breathe in for 4 counts, hold for 4, out for 4\n"
-            response += "• Try a simple body scan - relax each part of your body starting from your toes\n"
-            response += "• Think of a peaceful place - imagine all the details that make you feel calm\n"
-            response += "• Listen to gentle sounds or calming music\n\n"
-        
-        if 'nightmare' in message.lower() or 'scared' in message.lower():
-            response += "Remember that you're safe right now. Dreams can feel scary, but they can't hurt you. "
-            response += "If you're feeling afraid, it's okay to turn on a light or talk to a parent or guardian.\n\n"
-        
-        response += "It's okay to have trouble sleeping sometimes. Be patient with yourself. 💙"
-        
-        return response
+        cues = cues or _fine_flags(message.lower())
+        parts = [self.NIGHT_MODE_OPENING]
+        if cues['mentions_sleeplessness']:
+            parts.append(self.NIGHT_MODE_TECHNIQUES)
+        if cues['mentions_fear']:
+            parts.append(self.NIGHT_MODE_REASSURANCE)
+        parts.append(self.NIGHT_MODE_CLOSING)
+        return ''.join(parts)
     
     def _generate_neutral_response(self, message: str, scan_result: Dict) -> str:
         """Generate supportive response for neutral messages"""
-        response = "Thank you for sharing with me. I'm here to listen and support you. "
-        response += "How are you feeling today?"
-        
-        return response
+        return self.NEUTRAL_RESPONSE
     
     def check_geofence(self, lat: float, lon: float, safe_zones: List[Dict]) -> Dict:
         """
@@ -343,44 +622,37 @@ class LunaSafetyCore:
         Returns:
             Dict with geofence status
         """
-        from math import radians, cos, sin, asin, sqrt
-        
-        def haversine(lat1, lon1, lat2, lon2):
-            """Calculate distance between two points on Earth in meters"""
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * asin(sqrt(a))
-            r = 6371000  # Radius of Earth in meters
-            return c * r
-        
         in_safe_zone = False
         nearest_zone = None
         min_distance = float('inf')
-        
-        for zone in safe_zones:
-            distance = haversine(lat, lon, zone['lat'], zone['lon'])
-            
-            if distance < min_distance:
-                min_distance = distance
-                nearest_zone = zone
-            
-            if distance <= zone['radius']:
-                in_safe_zone = True
-                break
+
+        if np is not None and len(safe_zones) >= VECTORIZE_MIN_ZONES:
+            in_safe_zone, nearest, min_distance = _nearest_zone_vectorized(lat, lon, safe_zones)
+            nearest_zone = safe_zones[nearest]
+        else:
+            for zone in safe_zones:
+                distance = _zone_distance(lat, lon, zone['lat'], zone['lon'])
+
+                if distance < min_distance:
+                    min_distance = distance
+                    nearest_zone = zone
+
+                if distance <= zone['radius']:
+                    in_safe_zone = True
+                    break
         
         return {
             'in_safe_zone': in_safe_zone,
             'nearest_zone': nearest_zone,
             'distance_to_nearest': min_distance,
             'current_location': {'lat': lat, 'lon': lon},
-            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'timestamp': utc_now_iso(),
             'alert_parent': not in_safe_zone
         }
     
     def create_alert(self, alert_type: str, severity: str, 
-                    message: str, metadata: Optional[Dict] = None) -> Dict:
+                    message: str, metadata: Optional[Dict] = None,
+                    now: Optional[datetime] = None) -> Alert:
         """
         Create parent alert for safety concerns
         
@@ -389,25 +661,23 @@ class LunaSafetyCore:
             severity: Severity level (critical, high, moderate, low)
             message: Alert message
             metadata: Optional additional context
+            now: Optional aware UTC datetime to stamp the alert with
         
         Returns:
-            Alert dict ready to send via Firebase or other notification system
+            Alert ready to persist or send via a notification system.
+            In offline mode it is marked as queued for later delivery.
         """
-        alert = {
-            'id': f"alert_{datetime.now(timezone.utc).timestamp()}",
-            'type': alert_type,
-            'severity': severity,
-            'message': message,
-            'timestamp': datetime.now(timezone.utc).isoformat(),
-            'status': 'pending',
-            'metadata': metadata or {}
-        }
-        
-        # In offline mode, queue for later delivery
-        if self.offline_mode:
-            alert['queued_offline'] = True
-        
-        return alert
+        if now is None:
+            now = datetime.now(timezone.utc)
+        return Alert(
+            id=f"alert_{_ALERT_ID_BASE}_{next(_alert_counter)}",
+            type=alert_type,
+            severity=severity,
+            message=message,
+            timestamp=now.isoformat(),
+            metadata=metadata or {},
+            queued_offline=self.offline_mode,
+        )
     
     def validate_night_mode_time(self, hour: int = None) -> Dict:
         """
@@ -421,34 +691,59 @@ class LunaSafetyCore:
         """
         if hour is None:
             hour = datetime.now().hour
-        
-        # Night mode: 8 PM (20:00) to 7 AM (07:00)
-        is_night_mode = hour >= 20 or hour < 7
-        
-        bedtime_window = 20 <= hour <= 22  # 8-10 PM is bedtime window
-        
-        response = {
+        state = _NIGHT_MODE_TABLE[hour] if 0 <= hour < 24 else _night_mode_state(hour)
+        is_night_mode, bedtime_window, recommendations = state
+        return {
             'is_night_mode': is_night_mode,
             'is_bedtime_window': bedtime_window,
             'current_hour': hour,
-            'recommendations': []
+            'recommendations': list(recommendations),
         }
-        
-        if bedtime_window:
-            response['recommendations'].extend([
-                'Start winding down activities',
-                'Reduce screen brightness',
-                'Consider calming activities',
-                'Prepare for bedtime routine'
-            ])
-        elif is_night_mode and hour >= 23:
-            response['recommendations'].extend([
-                'It\'s getting late - consider getting rest',
-                'Tomorrow is a new day',
-                'Your body needs sleep to stay healthy'
-            ])
-        
-        return response
+
+
+def _fine_flags(message_lower: str, seen: Optional[set] = None) -> Dict[str, bool]:
+    """Response-wording cues. ``seen`` is the raw keyword set from the match pass."""
+    if seen is None:
+        def mentions(*words: str) -> bool:
+            return any(word in message_lower for word in words)
+    else:
+        def mentions(*words: str) -> bool:
+            return any(word in seen for word in words)
+    return {
+        'mentions_anxiety': mentions('anxious', 'anxiety'),
+        # 'sad' is not a scanner keyword, so it is always a substring probe.
+        'mentions_sadness': 'sad' in message_lower or mentions('depressed'),
+        'mentions_sleeplessness': mentions("can't sleep", 'insomnia'),
+        'mentions_fear': mentions('nightmare', 'scared'),
+    }
+
+
+def _night_mode_state(hour: int) -> Tuple[bool, bool, Tuple[str, ...]]:
+    """Return (is_night_mode, is_bedtime_window, recommendations) for an hour."""
+    # Night mode: 8 PM (20:00) to 7 AM (07:00)
+    is_night_mode = hour >= 20 or hour < 7
+    bedtime_window = 20 <= hour <= 22  # 8-10 PM is bedtime window
+    if bedtime_window:
+        recommendations = BEDTIME_RECOMMENDATIONS
+    elif is_night_mode and hour >= 23:
+        recommendations = LATE_NIGHT_RECOMMENDATIONS
+    else:
+        recommendations = ()
+    return is_night_mode, bedtime_window, recommendations
+
+
+BEDTIME_RECOMMENDATIONS = (
+    'Start winding down activities',
+    'Reduce screen brightness',
+    'Consider calming activities',
+    'Prepare for bedtime routine',
+)
+LATE_NIGHT_RECOMMENDATIONS = (
+    'It\'s getting late - consider getting rest',
+    'Tomorrow is a new day',
+    'Your body needs sleep to stay healthy',
+)
+_NIGHT_MODE_TABLE = tuple(_night_mode_state(hour) for hour in range(24))
 
 
 # Convenience function for quick scanning
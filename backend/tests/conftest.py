@@ -0,0 +1,84 @@
+"""
+Shared fixtures for the backend test suite
+"""
+
+import sys
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+
+import pytest
+
+# Make the backend modules importable from every test file
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    """Create one test client per module with an isolated alert database."""
+    from alert_store import AlertStore
+    import app as app_module
+
+    db_path = str(tmp_path_factory.mktemp('alerts') / 'test_alerts.db')
+    app = app_module.app
+    app.config['DEMO_AUTH'] = True
+    app.config['TESTING'] = True
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('ALERT_DB_PATH', db_path)
+        mp.setattr(app_module, 'DEMO_AUTH', True)
+        mp.setattr(app_module, 'alert_store', AlertStore(db_path))
+        with app.test_client() as test_client:
+            # Warm routing, the JSON provider and the scan path before any test runs
+            test_client.get('/health')
+            token = test_client.post('/auth/login', json={'user_id': '_warm'}).get_json()['token']
+            test_client.post(
+                '/scan',
+                json={'message': 'warm up'},
+                headers={'Authorization': f'Bearer {token}'},
+            )
+            yield test_client
+
+
+@pytest.fixture(scope='module')
+def auth_token(client):
+    """Get authentication token once per module."""
+    response = client.post(
+        '/auth/login',
+        json={'user_id': 'test_user'},
+    )
+    data = response.get_json()
+    return data['token']
+
+
+@pytest.fixture(scope='module')
+def core():
+    """One core instance shared by the module; attributes are restored per test"""
+    from luna_safety_core import LunaSafetyCore
+
+    return LunaSafetyCore(offline_mode=True, use_spacy=False)
+
+
+@pytest.fixture(autouse=True)
+def _restore_core_state(request):
+    """Put the shared core's attributes back after every test that uses it."""
+    if 'core' not in request.fixturenames:
+        yield
+        return
+    core = request.getfixturevalue('core')
+    state = dict(vars(core))
+    yield
+    vars(core).clear()
+    vars(core).update(state)
+
+
+@pytest.fixture(scope='module')
+def cached_scan(core):
+    """Memoized core.scan_message; each message is scanned once per module.
+
+    Results are shared between tests, so they come back as read-only views.
+    """
+    @lru_cache(maxsize=128)
+    def scan(message):
+        return MappingProxyType(core.scan_message(message))
+
+    return scan
@@ -2,56 +2,98 @@
 Tests for Flask API endpoints
 """
 
-import json
 import os
 import subprocess
 import sys
 import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
 
 import pytest
 
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
-
-from alert_store import AlertStore
 import app as app_module
-from app import app, luna_core
-
-
-@pytest.fixture
-def client(tmp_path, monkeypatch):
-    """Create test client with isolated alert database."""
-    db_path = str(tmp_path / 'test_alerts.db')
-    monkeypatch.setenv('ALERT_DB_PATH', db_path)
-    monkeypatch.setattr(app_module, 'DEMO_AUTH', True)
-    app.config['DEMO_AUTH'] = True
-    app_module.alert_store = AlertStore(db_path)
-    app.config['TESTING'] = True
-
-    with app.test_client() as test_client:
-        yield test_client
 
 
-@pytest.fixture
-def auth_token(client):
-    """Get authentication token."""
-    response = client.post(
-        '/auth/login',
-        data=json.dumps({'user_id': 'test_user'}),
-        content_type='application/json',
-    )
-    data = json.loads(response.data)
-    return data['token']
+def _lookup(data, path):
+    """Resolve a dotted path such as 'scan_result.flags.distress'."""
+    for part in path.split('.'):
+        data = data[part]
+    return data
+
+
+def _text(value):
+    return isinstance(value, str) and bool(value.strip())
+
+
+# (endpoint, payload, expected status, {dotted path: expected value or predicate})
+ENDPOINT_CASES = [
+    pytest.param(
+        '/chat', {'message': 'I feel anxious'}, 200,
+        {'response': _text, 'scan_result.flags.distress': True},
+        id='chat-distress',
+    ),
+    pytest.param(
+        '/chat', {'message': 'I feel hopeless and worthless'}, 200,
+        {'alert_created': True},
+        id='chat-high-severity-creates-alert',
+    ),
+    pytest.param('/chat', {}, 400, {}, id='chat-missing-message'),
+    pytest.param('/chat', {'message': 'x' * 5000}, 400, {}, id='chat-oversized-message'),
+    pytest.param(
+        '/location',
+        {
+            'lat': 42.0,
+            'lon': -84.0,
+            'safe_zones': [{'lat': 42.0, 'lon': -84.0, 'radius': 1000, 'name': 'Home'}],
+        },
+        200,
+        {'in_safe_zone': True, 'alert_created': False},
+        id='location-inside',
+    ),
+    pytest.param('/location', {}, 400, {}, id='location-missing-coords'),
+    pytest.param('/location', {'lat': 'west', 'lon': -84.2}, 400, {}, id='location-invalid-coords'),
+    pytest.param(
+        '/night_mode', {'action': 'check_time'}, 200,
+        {
+            'response': _text,
+            'night_mode_status.is_night_mode': lambda v: isinstance(v, bool),
+            'recommendations': lambda v: isinstance(v, list),
+        },
+        id='night-mode-check-time',
+    ),
+    pytest.param(
+        '/night_mode', {'action': 'get_calming_response', 'message': "I can't sleep"}, 200,
+        {'response': lambda r: any(word in r.lower() for word in ('breathe', 'calm'))},
+        id='night-mode-calming-response',
+    ),
+    pytest.param(
+        '/night_mode', {'action': 'bedtime_reminder'}, 200,
+        {'response': lambda r: 'Bedtime reminder' in r},
+        id='night-mode-bedtime-reminder',
+    ),
+    pytest.param(
+        '/night_mode', {'action': 'not_a_real_action'}, 400,
+        {'error.allowed_actions': bool},
+        id='night-mode-invalid-action',
+    ),
+]
 
 
 class TestAPIEndpoints:
     """Test suite for Flask API endpoints."""
 
+    @pytest.fixture(autouse=True)
+    def _reset_state(self, client):
+        """Give each test an empty alert store and fresh rate-limit buckets."""
+        app_module.alert_store.clear_all()
+        app_module._rate_buckets.clear()
+
     def test_health_check(self, client):
         """Test health check endpoint."""
         response = client.get('/health')
         assert response.status_code == 200
 
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['status'] == 'healthy'
         assert 'timestamp' in data
 
@@ -59,12 +101,11 @@ class TestAPIEndpoints:
         """Test demo login issues a token with demo notice."""
         response = client.post(
             '/auth/login',
-            data=json.dumps({'user_id': 'test_user'}),
-            content_type='application/json',
+            json={'user_id': 'test_user'},
         )
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'token' in data
         assert 'expires_at' in data
         assert data['demo_auth'] is True
@@ -74,107 +115,92 @@ class TestAPIEndpoints:
         """Test login with missing user_id."""
         response = client.post(
             '/auth/login',
-            data=json.dumps({}),
-            content_type='application/json',
+            json={},
         )
 
         assert response.status_code == 400
 
-    def test_chat_without_token(self, client):
-        """Test chat endpoint without authentication."""
+    @pytest.mark.parametrize('endpoint, payload, status, checks', ENDPOINT_CASES)
+    def test_authenticated_post(self, client, auth_token, endpoint, payload, status, checks):
+        """Table-driven status and body checks for chat, location and night mode."""
         response = client.post(
-            '/chat',
-            data=json.dumps({'message': 'Hello'}),
-            content_type='application/json',
+            endpoint,
+            json=payload,
+            headers={'Authorization': f'Bearer {auth_token}'},
         )
 
-        assert response.status_code == 401
+        assert response.status_code == status
+        data = response.get_json()
+        for path, expected in checks.items():
+            value = _lookup(data, path)
+            if isinstance(expected, bool):
+                assert value is expected, path
+            elif callable(expected):
+                assert expected(value), path
+            else:
+                assert value == expected, path
 
-    def test_chat_with_token(self, client, auth_token):
-        """Test chat endpoint with valid token."""
+    def test_chat_without_token(self, client):
+        """Test chat endpoint without authentication."""
         response = client.post(
             '/chat',
-            data=json.dumps({'message': 'I feel anxious'}),
-            content_type='application/json',
-            headers={'Authorization': f'Bearer {auth_token}'},
+            json={'message': 'Hello'},
         )
 
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert 'response' in data
-        assert 'scan_result' in data
-        assert data['scan_result']['flags']['distress'] is True
+        assert response.status_code == 401
 
     def test_chat_crisis_creates_persisted_alert(self, client, auth_token):
-        """Test chat with crisis message creates and persists an alert."""
+        """Test chat with crisis message persists an alert without the raw text."""
         response = client.post(
             '/chat',
-            data=json.dumps({'message': 'I want to kill myself'}),
-            content_type='application/json',
+            json={'message': 'I want to kill myself'},
             headers={'Authorization': f'Bearer {auth_token}'},
         )
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['alert_created'] is True
         assert data['scan_result']['severity'] == 'critical'
         assert '988' in data['response']
         assert data['alert'] is not None
         assert data['alert']['user_id'] == 'test_user'
+        assert 'original_message' not in (data['alert'].get('metadata') or {})
 
         alerts_response = client.get(
             '/alerts',
             headers={'Authorization': f'Bearer {auth_token}'},
         )
-        alerts_data = json.loads(alerts_response.data)
+        alerts_data = alerts_response.get_json()
         assert alerts_data['count'] >= 1
         assert alerts_data['alerts'][0]['alert_type'] == 'safety_concern'
 
-    def test_chat_distress_creates_alert(self, client, auth_token):
-        """Test chat with high-severity distress creates an alert."""
+    def test_scan_batch(self, client, auth_token):
+        """Batch scan returns per-message flags without persisting alerts."""
         response = client.post(
-            '/chat',
-            data=json.dumps({'message': 'I feel hopeless and worthless'}),
-            content_type='application/json',
+            '/api/v1/scan/batch',
+            json={'messages': ['I want to kill myself', 'I had a good day', '']},
             headers={'Authorization': f'Bearer {auth_token}'},
         )
 
         assert response.status_code == 200
-        data = json.loads(response.data)
-        assert data['alert_created'] is True
-
-    def test_chat_missing_message(self, client, auth_token):
-        """Test chat with missing message."""
-        response = client.post(
-            '/chat',
-            data=json.dumps({}),
-            content_type='application/json',
-            headers={'Authorization': f'Bearer {auth_token}'},
-        )
+        data = response.get_json()['data']
+        assert data['count'] == 3
+        crisis, calm, empty = data['results']
+        assert crisis['flags']['crisis'] is True
+        assert crisis['severity'] == 'critical'
+        assert calm['safe'] is True
+        assert empty['severity'] == 'low'
 
-        assert response.status_code == 400
-
-    def test_location_geofence_inside(self, client, auth_token):
-        """Test location check inside safe zone."""
-        payload = {
-            'lat': 42.0,
-            'lon': -84.0,
-            'safe_zones': [
-                {'lat': 42.0, 'lon': -84.0, 'radius': 1000, 'name': 'Home'},
-            ],
-        }
+        assert app_module.alert_store.get_alerts_for_user('test_user') == []
 
+    def test_scan_batch_rejects_non_string(self, client, auth_token):
         response = client.post(
-            '/location',
-            data=json.dumps(payload),
-            content_type='application/json',
+            '/api/v1/scan/batch',
+            json={'messages': ['ok', 42]},
             headers={'Authorization': f'Bearer {auth_token}'},
         )
-
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert data['in_safe_zone'] is True
-        assert data['alert_created'] is False
+        assert response.status_code == 400
+        assert response.get_json()['error']['index'] == 1
 
     def test_location_geofence_outside_persists_alert(self, client, auth_token):
         """Test location outside safe zone creates persisted alert."""
@@ -188,78 +214,18 @@ class TestAPIEndpoints:
 
         response = client.post(
             '/location',
-            data=json.dumps(payload),
-            content_type='application/json',
+            json=payload,
             headers={'Authorization': f'Bearer {auth_token}'},
         )
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['in_safe_zone'] is False
         assert data['alert_created'] is True
 
-        alerts_response = client.get(
-            '/alerts',
-            headers={'Authorization': f'Bearer {auth_token}'},
-        )
-        alerts_data = json.loads(alerts_response.data)
-        assert alerts_data['count'] >= 1
-        assert alerts_data['alerts'][0]['alert_type'] == 'geofence_violation'
-
-    def test_location_missing_coords(self, client, auth_token):
-        """Test location with missing coordinates."""
-        response = client.post(
-            '/location',
-            data=json.dumps({}),
-            content_type='application/json',
-            headers={'Authorization': f'Bearer {auth_token}'},
-        )
-
-        assert response.status_code == 400
-
-    def test_night_mode_check_time(self, client, auth_token):
-        """Test night mode time check."""
-        response = client.post(
-            '/night_mode',
-            data=json.dumps({'action': 'check_time'}),
-            content_type='application/json',
-            headers={'Authorization': f'Bearer {auth_token}'},
-        )
-
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert 'response' in data
-        assert 'night_mode_status' in data
-        assert 'recommendations' in data
-
-    def test_night_mode_calming_response(self, client, auth_token):
-        """Test night mode calming response."""
-        response = client.post(
-            '/night_mode',
-            data=json.dumps({
-                'action': 'get_calming_response',
-                'message': "I can't sleep",
-            }),
-            content_type='application/json',
-            headers={'Authorization': f'Bearer {auth_token}'},
-        )
-
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert 'breathe' in data['response'].lower() or 'calm' in data['response'].lower()
-
-    def test_night_mode_bedtime_reminder(self, client, auth_token):
-        """Test night mode bedtime reminder."""
-        response = client.post(
-            '/night_mode',
-            data=json.dumps({'action': 'bedtime_reminder'}),
-            content_type='application/json',
-            headers={'Authorization': f'Bearer {auth_token}'},
-        )
-
-        assert response.status_code == 200
-        data = json.loads(response.data)
-        assert 'Bedtime reminder' in data['response']
+        stored = app_module.alert_store.get_alerts_for_user('test_user')
+        assert len(stored) >= 1
+        assert stored[0]['alert_type'] == 'geofence_violation'
 
     def test_get_alerts_empty(self, client, auth_token):
         """Test get alerts endpoint returns empty list initially."""
@@ -269,7 +235,7 @@ class TestAPIEndpoints:
         )
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'alerts' in data
         assert 'count' in data
         assert data['count'] == 0
@@ -279,7 +245,7 @@ class TestAPIEndpoints:
         response = client.get('/demo')
         assert response.status_code == 200
 
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'disclaimer' in data
         assert 'chat_scenarios' in data
         assert 'geofence_scenario' in data
@@ -293,40 +259,55 @@ class TestAPIEndpoints:
         response = client.get('/resources')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'crisis_resources' in data
         assert 'notice' in data
         assert 'donation_links' not in data
         assert '988' in data['crisis_resources']
 
-    def test_night_mode_invalid_action(self, client, auth_token):
-        response = client.post(
-            '/night_mode',
-            data=json.dumps({'action': 'not_a_real_action'}),
-            content_type='application/json',
-            headers={'Authorization': f'Bearer {auth_token}'},
-        )
-        assert response.status_code == 400
-        data = json.loads(response.data)
-        allowed = data.get('allowed_actions') or data.get('error', {}).get('allowed_actions')
-        assert allowed
+    def test_get_resources_gzip(self, client):
+        """Resources are served precompressed when the client accepts gzip."""
+        import gzip
 
-    def test_location_invalid_coords(self, client, auth_token):
-        response = client.post(
-            '/location',
-            data=json.dumps({'lat': 'west', 'lon': -84.2}),
-            content_type='application/json',
-            headers={'Authorization': f'Bearer {auth_token}'},
-        )
-        assert response.status_code == 400
+        plain = client.get('/resources')
+        response = client.get('/resources', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.data) == plain.data
+        assert 'Content-Encoding' not in plain.headers
 
     def test_status_endpoint(self, client):
         response = client.get('/status')
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['scanner']['clinical_validation'] is False
         assert data['alert_store'] == 'sqlite_local'
 
+    def test_cors_allowed_origin(self, client):
+        response = client.get('/health', headers={'Origin': 'http://localhost:8000'})
+        assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:8000'
+        assert 'Origin' in response.headers['Vary']
+
+    def test_cors_disallowed_origin(self, client):
+        response = client.get('/health', headers={'Origin': 'https://evil.example'})
+        assert 'Access-Control-Allow-Origin' not in response.headers
+
+    def test_cors_preflight(self, client):
+        response = client.options(
+            '/chat',
+            headers={
+                'Origin': 'http://127.0.0.1:8000',
+                'Access-Control-Request-Method': 'POST',
+                'Access-Control-Request-Headers': 'Authorization, Content-Type',
+            },
+        )
+        assert response.status_code == 200
+        assert response.headers['Access-Control-Allow-Origin'] == 'http://127.0.0.1:8000'
+        assert 'POST' in response.headers['Access-Control-Allow-Methods']
+        assert 'Authorization' in response.headers['Access-Control-Allow-Headers']
+
     def test_showcase_served(self, client):
         response = client.get('/')
         assert response.status_code == 200
@@ -335,37 +316,16 @@ class TestAPIEndpoints:
     def test_ready_endpoint(self, client):
         response = client.get('/ready')
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['status'] == 'ready'
 
-    def test_chat_does_not_store_raw_by_default(self, client, auth_token):
-        response = client.post(
-            '/chat',
-            data=json.dumps({'message': 'I want to kill myself'}),
-            content_type='application/json',
-            headers={'Authorization': f'Bearer {auth_token}'},
-        )
-        data = json.loads(response.data)
-        assert data['alert_created'] is True
-        assert 'original_message' not in (data['alert'].get('metadata') or {})
-
-    def test_oversized_message_rejected(self, client, auth_token):
-        response = client.post(
-            '/chat',
-            data=json.dumps({'message': 'x' * 5000}),
-            content_type='application/json',
-            headers={'Authorization': f'Bearer {auth_token}'},
-        )
-        assert response.status_code == 400
-
     def test_delete_alert(self, client, auth_token):
         create = client.post(
             '/chat',
-            data=json.dumps({'message': 'I feel hopeless and worthless'}),
-            content_type='application/json',
+            json={'message': 'I feel hopeless and worthless'},
             headers={'Authorization': f'Bearer {auth_token}'},
         )
-        alert_id = json.loads(create.data)['alert']['id']
+        alert_id = create.get_json()['alert']['id']
         deleted = client.delete(
             f'/api/v1/alerts/{alert_id}',
             headers={'Authorization': f'Bearer {auth_token}'},
@@ -377,6 +337,61 @@ class TestAPIEndpoints:
         )
         assert missing.status_code == 404
 
+    def test_json_provider_round_trips_unicode(self, client, auth_token):
+        """JSON bodies are parsed and serialized without mangling non-ASCII text."""
+        if app_module.orjson is None:
+            pytest.skip('orjson not installed; the default provider escapes non-ASCII')
+        message = 'I feel anxious “today” 💙'
+        provider = app_module.app.json
+        encoded = provider.dumps({'message': message})
+        assert message in encoded  # Raw UTF-8, not \u escapes
+        assert provider.loads(encoded.encode('utf-8')) == {'message': message}
+
+        response = client.post(
+            '/chat',
+            data=encoded.encode('utf-8'),
+            content_type='application/json',
+            headers={'Authorization': f'Bearer {auth_token}'},
+        )
+
+        assert response.status_code == 200
+        body = response.get_data()
+        assert '🔒 Privacy Mode'.encode('utf-8') in body
+        assert b'\\u' not in body
+        assert response.get_json()['scan_result']['flags']['distress'] is True
+
+    def test_json_provider_keeps_http_dates(self, client):
+        """Datetimes serialize as HTTP dates, as with Flask's default provider."""
+        if app_module.orjson is None:
+            pytest.skip('orjson not installed; Flask\'s default provider is in use')
+        when = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        with app_module.app.app_context():
+            assert app_module.app.json.dumps({'at': when}) == '{"at":"Fri, 02 Jan 2026 03:04:05 GMT"}'
+            assert app_module.jsonify(at=when).get_json() == {'at': 'Fri, 02 Jan 2026 03:04:05 GMT'}
+
+    def test_verified_token_is_cached(self, client, auth_token, monkeypatch):
+        """A verified token is reused from the cache on later requests."""
+        app_module._token_cache.clear()
+        headers = {'Authorization': f'Bearer {auth_token}'}
+        assert client.get('/alerts', headers=headers).status_code == 200
+        assert app_module._token_cache[auth_token][0] == 'test_user'
+
+        def no_decode(*args, **kwargs):
+            raise app_module.jwt.InvalidTokenError('decode called on a cached token')
+
+        monkeypatch.setattr(app_module.jwt, 'decode', no_decode)
+        assert client.get('/alerts', headers=headers).status_code == 200
+        app_module._token_cache.clear()
+        assert client.get('/alerts', headers=headers).status_code == 401
+
+    def test_expired_cached_token_is_rejected(self, client):
+        """Cached entries past their exp fall through to full verification."""
+        app_module._token_cache['stale-token'] = ('test_user', 0.0)
+        response = client.get('/alerts', headers={'Authorization': 'Bearer stale-token'})
+
+        assert response.status_code == 401
+        assert 'stale-token' not in app_module._token_cache
+
     def test_404_error(self, client):
         """Test 404 error handling."""
         response = client.get('/nonexistent')
@@ -386,8 +401,7 @@ class TestAPIEndpoints:
         """Test request with invalid token."""
         response = client.post(
             '/chat',
-            data=json.dumps({'message': 'Hello'}),
-            content_type='application/json',
+            json={'message': 'Hello'},
             headers={'Authorization': 'Bearer invalid_token'},
         )
 
@@ -397,7 +411,7 @@ class TestAPIEndpoints:
 class TestProductionConfig:
     """Tests for production configuration requirements."""
 
-    BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    BACKEND_DIR = str(Path(__file__).resolve().parents[1])
 
     def test_production_requires_jwt_secret(self):
         """Production mode must not start without JWT_SECRET_KEY."""
@@ -4,127 +4,172 @@ Tests for Luna Safety Core
 
 import pytest
 from datetime import datetime
-import sys
-import os
 
-# Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
-
-from luna_safety_core import LunaSafetyCore, scan_text
+from luna_safety_core import scan_text
 
 
 class TestLunaSafetyCore:
     """Test suite for Luna Safety Core"""
     
-    def setup_method(self):
-        """Setup test instance"""
-        self.core = LunaSafetyCore(offline_mode=True, use_spacy=False)
-    
-    def test_initialization(self):
+    def test_initialization(self, core):
         """Test core initialization"""
-        assert self.core.offline_mode == True
-        assert self.core.use_spacy == False
-        assert self.core.nlp is None
+        assert core.offline_mode == True
+        assert core.use_spacy == False
+        assert core.nlp is None
     
-    def test_crisis_detection(self):
+    def test_crisis_detection(self, cached_scan):
         """Test crisis keyword detection"""
         crisis_message = "I want to kill myself"
-        result = self.core.scan_message(crisis_message)
+        result = cached_scan(crisis_message)
         
-        assert result['safe'] == False
-        assert result['flags']['crisis'] == True
-        assert result['severity'] == 'critical'
+        assert (result['safe'], result['flags']['crisis'], result['severity']) == (False, True, 'critical')
         assert 'RECOMMEND_ALERT_TRUSTED_ADULT' in result['actions']
         assert 'resources' in result
     
-    def test_distress_detection(self):
+    def test_distress_detection(self, cached_scan):
         """Test distress keyword detection"""
         distress_message = "I feel so anxious and overwhelmed"
-        result = self.core.scan_message(distress_message)
+        result = cached_scan(distress_message)
         
-        assert result['flags']['distress'] == True
-        assert result['severity'] == 'high'
+        assert (result['flags']['distress'], result['severity']) == (True, 'high')
         assert 'SUPPORTIVE_RESPONSE_MEDIUM' in result['actions']
     
-    def test_night_mode_detection(self):
+    def test_night_mode_detection(self, cached_scan):
         """Test night mode keyword detection"""
         night_message = "I can't sleep and having nightmares"
-        result = self.core.scan_message(night_message)
+        result = cached_scan(night_message)
         
-        assert result['flags']['night_mode'] == True
-        assert result['severity'] == 'moderate'
+        assert (result['flags']['night_mode'], result['severity']) == (True, 'moderate')
         assert 'NIGHT_MODE_SUPPORT' in result['actions']
     
-    def test_toxicity_detection(self):
+    def test_toxicity_detection(self, cached_scan):
         """Test toxicity keyword detection"""
         toxic_message = "I hate you and want to hurt you"
-        result = self.core.scan_message(toxic_message)
+        result = cached_scan(toxic_message)
         
-        assert result['safe'] == False
-        assert result['flags']['toxicity'] == True
-        assert result['severity'] == 'critical'
+        assert (result['safe'], result['flags']['toxicity'], result['severity']) == (False, True, 'critical')
     
-    def test_neutral_message(self):
+    def test_neutral_message(self, cached_scan):
         """Test neutral message processing"""
         neutral_message = "How are you today?"
-        result = self.core.scan_message(neutral_message)
+        result = cached_scan(neutral_message)
         
         assert result['safe'] == True
         assert result['severity'] == 'low'
         assert result['flags']['crisis'] == False
     
-    def test_empathy_response_crisis(self):
+    def test_empathy_response_crisis(self, core, cached_scan):
         """Test empathy response for crisis"""
         message = "I want to die"
-        response = self.core.generate_empathy_response(message)
+        response = core.generate_empathy_response(message, cached_scan(message))
+        response_lower = response.lower()
         
-        assert "difficult" in response.lower()
-        assert "988" in response or "crisis" in response.lower()
+        assert "difficult" in response_lower
+        assert "988" in response or "crisis" in response_lower
         assert "Privacy Mode" in response  # Offline mode notice
+        assert core.generate_empathy_response(message) == response  # Scans itself when not given a result
     
-    def test_empathy_response_distress(self):
+    def test_empathy_response_distress(self, core, cached_scan):
         """Test empathy response for distress"""
         message = "I feel so anxious"
-        response = self.core.generate_empathy_response(message)
+        response = core.generate_empathy_response(message, cached_scan(message))
         
-        assert "valid" in response.lower() or "courage" in response.lower()
-        assert "NAMI" in response or "support" in response.lower()
+        response_lower = response.lower()
+        assert any(word in response_lower for word in ("valid", "courage"))
+        assert "NAMI" in response or "support" in response_lower
     
-    def test_empathy_response_night_mode(self):
+    def test_empathy_response_night_mode(self, core, cached_scan):
         """Test empathy response for night mode"""
         message = "I can't sleep"
-        response = self.core.generate_empathy_response(message)
+        response = core.generate_empathy_response(message, cached_scan(message))
         
-        assert "calming" in response.lower() or "breathe" in response.lower()
+        assert any(word in response.lower() for word in ("calming", "breathe"))
         assert "💙" in response  # Empathy emoji
     
-    def test_geofence_inside_safe_zone(self):
+    def test_fine_flags_drive_response_wording(self, core):
+        """Response cues come from the scan pass but stay out of the public result"""
+        message = "I can't sleep and I'm scared"
+        result, cues = core.scan_with_cues(message)
+        
+        assert 'fine_flags' not in result
+        assert result == dict(core.scan_message(message), timestamp=result['timestamp'])
+        assert cues['mentions_sleeplessness'] == True
+        assert cues['mentions_fear'] == True
+        assert cues['mentions_anxiety'] == False
+        response = core.generate_empathy_response(message, result, cues)
+        assert "Anxiety can feel overwhelming" not in response
+        assert response == core.generate_empathy_response(message, result)
+    
+    def test_geofence_inside_safe_zone(self, core):
         """Test geofence when inside safe zone"""
         safe_zones = [
             {'lat': 42.0, 'lon': -84.0, 'radius': 1000, 'name': 'Home'}  # Synthetic demo location
         ]
         
-        result = self.core.check_geofence(42.0, -84.0, safe_zones)
+        result = core.check_geofence(42.0, -84.0, safe_zones)
         
         assert result['in_safe_zone'] == True
         assert result['alert_parent'] == False
     
-    def test_geofence_outside_safe_zone(self):
+    def test_geofence_outside_safe_zone(self, core):
         """Test geofence when outside safe zone"""
         safe_zones = [
             {'lat': 42.0, 'lon': -84.0, 'radius': 100, 'name': 'Home'}
         ]
         
         # Different location
-        result = self.core.check_geofence(43.0, -84.2, safe_zones)
+        result = core.check_geofence(43.0, -84.2, safe_zones)
         
         assert result['in_safe_zone'] == False
         assert result['alert_parent'] == True
         assert result['distance_to_nearest'] > 100
     
-    def test_create_alert(self):
+    def test_geofence_many_zones_first_match(self, core):
+        """Large zone lists stop at the first containing zone like the loop does"""
+        safe_zones = [
+            {'lat': 42.0 + i * 0.01, 'lon': -84.0, 'radius': 100, 'name': f'zone{i}'}
+            for i in range(12)
+        ]
+        safe_zones[6]['radius'] = 10000
+
+        result = core.check_geofence(42.03, -84.0, safe_zones)
+
+        assert result['in_safe_zone'] == True
+        assert result['nearest_zone']['name'] == 'zone3'
+        assert result['distance_to_nearest'] < 1
+    
+    def test_geofence_distance_close_to_haversine(self):
+        """Short-range approximation stays within a meter of haversine"""
+        from luna_safety_core import _haversine, _zone_distance
+
+        for lat2, lon2 in [(42.01, -84.0), (42.2, -84.3), (42.0, -83.7), (43.0, -84.2)]:
+            exact = _haversine(42.0, -84.0, lat2, lon2)
+            assert abs(_zone_distance(42.0, -84.0, lat2, lon2) - exact) < 1.0
+        assert abs(_zone_distance(0.0, 179.99, 0.0, -179.99) - _haversine(0.0, 179.99, 0.0, -179.99)) < 1.0
+        assert _zone_distance(80.0, 10.0, 80.3, 11.0) == _haversine(80.0, 10.0, 80.3, 11.0)  # Polar: exact
+    
+    def test_geofence_vectorized_matches_loop(self, core, monkeypatch):
+        """Large and small zone lists give the same verdict and distance near a boundary"""
+        import luna_safety_core
+        if luna_safety_core.np is None:
+            pytest.skip("numpy not installed")
+        for lat in (42.0, 65.0, 69.9, 75.0, 80.0):
+            safe_zones = [
+                {'lat': lat + i * 0.01, 'lon': 10.0, 'radius': 0.1 + 2000 * i, 'name': f'zone{i}'}
+                for i in range(1, 40)
+            ]
+            for dlat in (0.003, 0.2, 0.5):
+                vectorized = core.check_geofence(lat + dlat, 10.02, safe_zones)
+                monkeypatch.setattr(luna_safety_core, 'VECTORIZE_MIN_ZONES', len(safe_zones) + 1)
+                loop = core.check_geofence(lat + dlat, 10.02, safe_zones)
+                monkeypatch.undo()
+                assert vectorized['in_safe_zone'] == loop['in_safe_zone']
+                assert vectorized['nearest_zone'] is loop['nearest_zone']
+                assert vectorized['distance_to_nearest'] == pytest.approx(loop['distance_to_nearest'], abs=1e-6)
+    
+    def test_create_alert(self, core):
         """Test alert creation"""
-        alert = self.core.create_alert(
+        alert = core.create_alert(
             alert_type='crisis',
             severity='critical',
             message='Test alert',
@@ -138,46 +183,63 @@ class TestLunaSafetyCore:
         assert 'timestamp' in alert
         assert alert['queued_offline'] == True  # Offline mode
     
-    def test_night_mode_time_validation_bedtime(self):
+    def test_alert_ids_unique(self, core):
+        """Back-to-back alerts never share an id"""
+        ids = {core.create_alert('crisis', 'critical', 'Test alert')['id'] for _ in range(100)}
+        
+        assert len(ids) == 100
+    
+    def test_night_mode_time_validation_bedtime(self, core):
         """Test night mode time validation for bedtime window"""
-        result = self.core.validate_night_mode_time(hour=21)  # 9 PM
+        result = core.validate_night_mode_time(hour=21)  # 9 PM
         
         assert result['is_night_mode'] == True
         assert result['is_bedtime_window'] == True
         assert len(result['recommendations']) > 0
     
-    def test_night_mode_time_validation_late_night(self):
+    def test_night_mode_time_validation_late_night(self, core):
         """Test night mode time validation for late night"""
-        result = self.core.validate_night_mode_time(hour=23)  # 11 PM
+        result = core.validate_night_mode_time(hour=23)  # 11 PM
         
         assert result['is_night_mode'] == True
         assert result['is_bedtime_window'] == False
         assert 'getting late' in ' '.join(result['recommendations']).lower()
     
-    def test_night_mode_time_validation_daytime(self):
+    def test_night_mode_time_validation_daytime(self, core):
         """Test night mode time validation for daytime"""
-        result = self.core.validate_night_mode_time(hour=14)  # 2 PM
+        result = core.validate_night_mode_time(hour=14)  # 2 PM
         
         assert result['is_night_mode'] == False
         assert result['is_bedtime_window'] == False
         assert len(result['recommendations']) == 0
     
-    def test_empty_message(self):
+    def test_keyword_matcher_matches_fallback_scan(self, core, monkeypatch):
+        """Automaton matching agrees with the per-keyword fallback scan"""
+        message = "i don't want to die. i feel hopeless, anxious and can't sleep"
+        matched = core._match_keywords(message)
+
+        monkeypatch.setattr(core, '_automaton', None)
+        assert core._match_keywords(message) == matched
+        assert matched['crisis'] == []
+        assert matched['distress'] == ['anxious', 'hopeless']
+        assert matched['night_mode'] == ["can't sleep"]
+    
+    def test_empty_message(self, cached_scan):
         """Test handling of empty messages"""
-        result = self.core.scan_message("")
+        result = cached_scan("")
         
         assert 'error' in result
         assert result['safe'] == True
     
-    def test_sentiment_analysis_positive(self):
+    def test_sentiment_analysis_positive(self, cached_scan):
         """Test sentiment analysis for positive message"""
-        result = self.core.scan_message("I'm feeling happy and great today!")
+        result = cached_scan("I'm feeling happy and great today!")
         
         assert result['sentiment']['polarity'] > 0
     
-    def test_sentiment_analysis_negative(self):
+    def test_sentiment_analysis_negative(self, cached_scan):
         """Test sentiment analysis for negative message"""
-        result = self.core.scan_message("I feel terrible and sad")
+        result = cached_scan("I feel terrible and sad")
         
         assert result['sentiment']['polarity'] < 0
     
@@ -6,14 +6,36 @@ This script demonstrates how to use the MindMend Super AI API endpoints.
 Run the backend server first: python backend/app.py
 """
 
-import requests
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # Optional fast path; stdlib json is the fallback
+    orjson = None
+
 # Configuration
 BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8000")
 USER_ID = "demo_user"
+CHAT_MESSAGE = "I feel anxious about school tomorrow"
+CRISIS_MESSAGE = "I feel like I want to hurt myself"
+
+# requests.Session isn't documented as thread-safe, so every thread keeps its
+# own keep-alive session and sends AUTH_HEADERS explicitly with each request.
+_thread_sessions = threading.local()
+AUTH_HEADERS = {}
+
+def session():
+    """This thread's keep-alive session, created on first use"""
+    current = getattr(_thread_sessions, "session", None)
+    if current is None:
+        # Imported here so loading this module (or its helpers) doesn't pull in requests
+        import requests
+        current = _thread_sessions.session = requests.Session()
+    return current
 
 def print_section(title):
     """Print a formatted section header"""
@@ -23,13 +45,16 @@ def print_section(title):
 
 def pretty_print(data):
     """Pretty print JSON data"""
-    print(json.dumps(data, indent=2))
+    if orjson is not None:
+        print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
+    else:
+        print(json.dumps(data, indent=2))
 
 def demo_health_check():
     """Demo: Health check endpoint"""
     print_section("1. Health Check")
     
-    response = requests.get(f"{BASE_URL}/health")
+    response = session().get(f"{BASE_URL}/health")
     data = response.json()
     
     print(f"Status: {response.status_code}")
@@ -41,7 +66,7 @@ def demo_authentication():
     """Demo: Authentication / Login"""
     print_section("2. Authentication")
     
-    response = requests.post(
+    response = session().post(
         f"{BASE_URL}/auth/login",
         json={"user_id": USER_ID}
     )
@@ -50,53 +75,50 @@ def demo_authentication():
     print(f"Status: {response.status_code}")
     pretty_print(data)
     
-    return data.get("token")
+    token = data.get("token")
+    if token:
+        AUTH_HEADERS["Authorization"] = f"Bearer {token}"
+    return token
 
-def demo_chat(token, message):
-    """Demo: Chat with empathy and safety scanning"""
-    print_section(f"3. Chat - Message: '{message}'")
-    
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.post(
+def fetch_chat(message):
+    """POST a chat message"""
+    return session().post(
         f"{BASE_URL}/chat",
         json={"message": message},
-        headers=headers
+        headers=AUTH_HEADERS
     )
+
+def demo_chat(message, response):
+    """Demo: Chat with empathy and safety scanning"""
+    print_section(f"3. Chat - Message: '{message}'")
+    
     data = response.json()
     
     print(f"Status: {response.status_code}")
     print(f"\nEmpathy Response:\n{data['response']}\n")
+    scan = data['scan_result']
     print(f"Safety Scan Result:")
-    print(f"  - Safe: {data['scan_result']['safe']}")
-    print(f"  - Severity: {data['scan_result']['severity']}")
-    print(f"  - Flags: {data['scan_result']['flags']}")
+    print(f"  - Safe: {scan['safe']}")
+    print(f"  - Severity: {scan['severity']}")
+    print(f"  - Flags: {scan['flags']}")
     print(f"  - Alert Created: {data['alert_created']}")
 
-def demo_crisis_detection(token):
+def demo_crisis_detection(response):
     """Demo: Crisis detection in chat"""
     print_section("4. Crisis Detection")
     
-    crisis_message = "I feel like I want to hurt myself"
-    
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.post(
-        f"{BASE_URL}/chat",
-        json={"message": crisis_message},
-        headers=headers
-    )
     data = response.json()
     
-    print(f"Message: '{crisis_message}'")
+    print(f"Message: '{CRISIS_MESSAGE}'")
     print(f"\nStatus: {response.status_code}")
-    print(f"\nCrisis Detected: {data['scan_result']['flags']['crisis']}")
-    print(f"Severity: {data['scan_result']['severity']}")
+    scan = data['scan_result']
+    print(f"\nCrisis Detected: {scan['flags']['crisis']}")
+    print(f"Severity: {scan['severity']}")
     print(f"Alert Created: {data['alert_created']}")
     print(f"\nEmpathy Response (excerpt):\n{data['response'][:200]}...")
 
-def demo_geofence(token):
-    """Demo: Geofence checking"""
-    print_section("5. Geofence / Location Check")
-    
+def fetch_geofence():
+    """POST a synthetic location with one safe zone"""
     # Synthetic demo coordinates
     payload = {
         "lat": 42.0,
@@ -111,12 +133,16 @@ def demo_geofence(token):
         ]
     }
     
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.post(
+    return session().post(
         f"{BASE_URL}/location",
         json=payload,
-        headers=headers
+        headers=AUTH_HEADERS
     )
+
+def demo_geofence(response):
+    """Demo: Geofence checking"""
+    print_section("5. Geofence / Location Check")
+    
     data = response.json()
     
     print(f"Status: {response.status_code}")
@@ -126,50 +152,53 @@ def demo_geofence(token):
     print(f"  - Distance to Nearest: {data['distance_to_nearest']:.2f} meters")
     print(f"  - Alert Parent: {data['alert_parent']}")
 
-def demo_night_mode(token):
-    """Demo: Night mode / bedtime support"""
-    print_section("6. Night Mode")
-    
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    # Check time
-    response = requests.post(
+def fetch_night_mode():
+    """POST a night mode time check"""
+    return session().post(
         f"{BASE_URL}/night_mode",
         json={"action": "check_time"},
-        headers=headers
+        headers=AUTH_HEADERS
     )
+
+def demo_night_mode(response):
+    """Demo: Night mode / bedtime support"""
+    print_section("6. Night Mode")
+    
     data = response.json()
     
     print(f"Status: {response.status_code}")
     print(f"\nNight Mode Status:")
-    print(f"  - Is Night Mode: {data['night_mode_status']['is_night_mode']}")
-    print(f"  - Is Bedtime Window: {data['night_mode_status']['is_bedtime_window']}")
-    print(f"  - Current Hour: {data['night_mode_status']['current_hour']}")
+    nm = data['night_mode_status']
+    print(f"  - Is Night Mode: {nm['is_night_mode']}")
+    print(f"  - Is Bedtime Window: {nm['is_bedtime_window']}")
+    print(f"  - Current Hour: {nm['current_hour']}")
     print(f"\nResponse: {data['response']}")
     
-    if data['recommendations']:
-        print(f"\nRecommendations:")
-        for rec in data['recommendations']:
-            print(f"  - {rec}")
+    recommendations = data['recommendations']
+    if recommendations:
+        print("\nRecommendations:\n" + "\n".join(f"  - {rec}" for rec in recommendations))
 
-def demo_resources():
+def fetch_resources():
+    """GET the crisis resource list"""
+    return session().get(f"{BASE_URL}/resources", headers=AUTH_HEADERS)
+
+def demo_resources(response):
     """Demo: Get crisis resources"""
-    print_section("7. Crisis Resources & Donation Links")
+    print_section("7. Crisis Resources")
     
-    response = requests.get(f"{BASE_URL}/resources")
     data = response.json()
     
     print(f"Status: {response.status_code}")
-    print(f"\nCrisis Resources:")
-    for key, value in data['crisis_resources'].items():
-        print(f"  - {value}")
-    
-    print(f"\nSupport MindMend:")
-    for key, value in data['donation_links'].items():
-        print(f"  - {key}: {value}")
+    print("\nCrisis Resources:\n" + "\n".join(
+        f"  - {value}" for value in data['crisis_resources'].values()
+    ))
+    print(f"\n{data['notice']}")
 
 def main():
     """Run all demos"""
+    # Imported here so loading this module (or its helpers) doesn't pull in requests
+    import requests
+
     print("\n" + "█" * 60)
     print("  MindMend Super AI - API Demo")
     print("  Privacy-First Youth Mental Health & Safety")
@@ -187,20 +216,29 @@ def main():
             print("\n❌ Authentication failed")
             return
         
+        # Steps 3-7 only need the token, so their requests run concurrently,
+        # one session per worker thread; results are still printed in step order.
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            chat = pool.submit(fetch_chat, CHAT_MESSAGE)
+            crisis = pool.submit(fetch_chat, CRISIS_MESSAGE)
+            geofence = pool.submit(fetch_geofence)
+            night_mode = pool.submit(fetch_night_mode)
+            resources = pool.submit(fetch_resources)
+        
         # 3. Normal chat
-        demo_chat(token, "I feel anxious about school tomorrow")
+        demo_chat(CHAT_MESSAGE, chat.result())
         
         # 4. Crisis detection
-        demo_crisis_detection(token)
+        demo_crisis_detection(crisis.result())
         
         # 5. Geofence
-        demo_geofence(token)
+        demo_geofence(geofence.result())
         
         # 6. Night mode
-        demo_night_mode(token)
+        demo_night_mode(night_mode.result())
         
         # 7. Resources
-        demo_resources()
+        demo_resources(resources.result())
         
         print_section("✅ Demo Complete!")
         print("All API endpoints are working correctly.")